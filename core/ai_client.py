@@ -1,84 +1,281 @@
 from __future__ import annotations
 
 import os
+import random
+import re
+import threading
+import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-import requests
-import random
 from dotenv import load_dotenv
 
+from core import json_utils
+
+if TYPE_CHECKING:
+    import requests
+
 ROOT_DIR = Path(__file__).resolve().parents[1]
 load_dotenv(ROOT_DIR / ".env")
 load_dotenv()
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class OpenAIConfig:
     api_key_env: str = "OPENAI_API_KEY"
     model: str = "gpt-5.2"
     base_url: str = "https://api.openai.com/v1"
 
 
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRY_MAX_ATTEMPTS = 4
+RETRY_BASE_DELAY_S = 1.0
+RETRY_MAX_DELAY_S = 30.0
+# Cap on the total sleep between attempts, server-hinted waits included.
+RETRY_MAX_TOTAL_WAIT_S = 60.0
+# Fail-fast budget for callers running under a short deadline (pipeline steps, subprocess timeouts).
+FAST_FAIL_MAX_ATTEMPTS = 2
+FAST_FAIL_MAX_RETRY_WAIT_S = 4.0
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+class OpenAIHTTPError(RuntimeError):
+    """Non-2xx answer from the API (after retries, for retryable statuses)."""
+
+    def __init__(self, message: str, *, status_code: int) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RateLimitError(OpenAIHTTPError):
+    """OpenAI kept answering 429 after all retries. retry_after_s is the server hint, if any."""
+
+    def __init__(self, message: str, *, retry_after_s: float | None = None) -> None:
+        super().__init__(message, status_code=429)
+        self.retry_after_s = retry_after_s
+
+
 def is_openai_configured(cfg: OpenAIConfig) -> bool:
     v = os.getenv(cfg.api_key_env, "").strip()
     return bool(v)
 
 
-def generate_caption_and_hashtags(*, themes: list[str], track_id: str = "", niche: str, cfg: OpenAIConfig) -> tuple[str, str]:
-    """Returns (caption_line1, hashtags_line2). Uses cheapest default model.
+def _chat_url(cfg: OpenAIConfig) -> str:
+    return f"{cfg.base_url.rstrip('/')}/chat/completions"
 
-    Requires OPENAI_API_KEY in environment.
-    """
 
+def _require_api_key(cfg: OpenAIConfig) -> str:
     api_key = os.getenv(cfg.api_key_env, "").strip()
     if not api_key:
         raise RuntimeError(f"Missing {cfg.api_key_env} env var")
+    return api_key
+
+
+# Static instructions live entirely in the system message (byte-identical across calls) and the
+# per-track data goes last, so OpenAI's automatic prefix cache can reuse the shared prefix.
+CAPTION_SYSTEM_PROMPT = (
+    "You are a curator for an aesthetic house music channel. You write extremely minimalist, "
+    "sophisticated captions inspired by the song's atmosphere or lyrics. No emojis. No artist/track names.\n\n"
+    "Output as JSON with keys: caption, hashtags.\n"
+    "Rules:\n"
+    "- caption: 2-4 words maximum. Avoid 'vibes', 'groove', 'energy', 'mood'. Be sensorial or poetic.\n"
+    "- hashtags: 4-5 total. Start with #housemusic, end with #fyp. Context tags in between.\n"
+)
+
+FINAL_CAPTION_SYSTEM_PROMPT = (
+    "You are a curator for an aesthetic house music channel. You write extremely minimalist, "
+    "sophisticated captions inspired by the iconic song's soul. No emojis.\n\n"
+    "Write a 1-line minimalist caption for a reel featuring the given track.\n"
+    "Rules:\n"
+    "- 2 to 4 words total.\n"
+    "- No artist or track names.\n"
+    "- Be sensorial, abstract, or inspired by the song's meaning.\n"
+    "- NO 'vibes', 'groove', 'energy', 'mood'.\n"
+    "- Followed by 4-5 hashtags starting with #housemusic and ending with #fyp.\n"
+    "Format: [Caption]. #hashtag1 #hashtag2 #fyp"
+)
+
 
-    url = f"{cfg.base_url.rstrip('/')}/chat/completions"
-    payload = {
+def _track_user_message(*, themes: list[str], track_id: str) -> str:
+    return f"Song: {track_id.replace('_', ' ')}. Themes: {', '.join(themes)}."
+
+
+def _build_caption_payload(*, themes: list[str], track_id: str, cfg: OpenAIConfig) -> dict[str, Any]:
+    return {
         "model": cfg.model,
         "temperature": 1.0,
         "response_format": {"type": "json_object"},
         "messages": [
-            {
-                "role": "system",
-                "content": "You are a curator for an aesthetic house music channel. You write extremely minimalist, sophisticated captions inspired by the song's atmosphere or lyrics. No emojis. No artist/track names."
-            },
-            {
-                "role": "user",
-                "content": (
-                    f"Create a minimalist caption for the song: {track_id.replace('_', ' ')}.\n"
-                    f"Visual Themes: {', '.join(themes)}.\n\n"
-                    "Output as JSON with keys: caption, hashtags.\n"
-                    "Rules:\n"
-                    "- caption: 2-4 words maximum. Avoid 'vibes', 'groove', 'energy', 'mood'. Be sensorial or poetic.\n"
-                    "- hashtags: 4-5 total. Start with #housemusic, end with #fyp. Context tags in between.\n"
-                ),
-            }
+            {"role": "system", "content": CAPTION_SYSTEM_PROMPT},
+            {"role": "user", "content": _track_user_message(themes=themes, track_id=track_id)},
+        ],
+    }
+
+
+def _build_final_caption_payload(*, themes: list[str], track_id: str, cfg: OpenAIConfig) -> dict[str, Any]:
+    return {
+        "model": cfg.model,
+        "temperature": 1.0,
+        "messages": [
+            {"role": "system", "content": FINAL_CAPTION_SYSTEM_PROMPT},
+            {"role": "user", "content": _track_user_message(themes=themes, track_id=track_id)},
         ],
     }
 
-    r = requests.post(
-        url,
-        headers={
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        },
-        json=payload,
-        timeout=60,
+
+def _post_chat(
+    payload: dict[str, Any],
+    cfg: OpenAIConfig,
+    *,
+    timeout: float = 60.0,
+    max_attempts: int = RETRY_MAX_ATTEMPTS,
+    max_retry_wait_s: float | None = RETRY_MAX_TOTAL_WAIT_S,
+) -> dict[str, Any]:
+    return _post_with_retry(
+        _chat_url(cfg),
+        payload,
+        _require_api_key(cfg),
+        timeout=timeout,
+        max_attempts=max_attempts,
+        max_retry_wait_s=max_retry_wait_s,
     )
-    if r.status_code >= 400:
-        raise RuntimeError(r.text)
 
-    data: dict[str, Any] = r.json()
+
+def _parse_reset_header(value: str | None) -> float | None:
+    """Parses Retry-After ("2", "1.5") and x-ratelimit-reset-* ("1s", "6m0s", "250ms") values."""
+
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value):
+        matched = True
+        total += float(amount) * {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}[unit]
+    return total if matched else None
+
+
+def _retry_delay_s(attempt: int, response: requests.Response | None) -> float:
+    if response is not None:
+        for header in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+            hinted = _parse_reset_header(response.headers.get(header))
+            if hinted is not None:
+                return min(hinted, RETRY_MAX_DELAY_S)
+    backoff = min(RETRY_MAX_DELAY_S, RETRY_BASE_DELAY_S * (2 ** attempt))
+    # Full jitter keeps concurrent workers from retrying in lockstep.
+    return random.uniform(0.0, backoff)
+
+
+def _get_session() -> requests.Session:
+    """Shared keep-alive session: back-to-back calls reuse the TCP/TLS connection."""
+    global _session
+    if _session is None:
+        # Imported lazily: callers that only need OpenAIConfig/is_openai_configured skip loading requests.
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=0))
+                _session = session
+    return _session
+
+
+def _post_with_retry(
+    url: str,
+    payload: dict[str, Any],
+    api_key: str,
+    *,
+    timeout: float = 60.0,
+    max_attempts: int = RETRY_MAX_ATTEMPTS,
+    max_retry_wait_s: float | None = RETRY_MAX_TOTAL_WAIT_S,
+) -> dict[str, Any]:
+    """POST with retries on transient failures.
+
+    max_retry_wait_s caps the total time spent sleeping between attempts (None = no cap);
+    once the budget is used up the last error is raised instead of waiting longer.
+    """
+    import requests
+
+    session = _get_session()
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+    max_attempts = max(1, int(max_attempts))
+    waited = 0.0
+    last_exc: Exception | None = None
+    for attempt in range(max_attempts):
+        last_attempt = attempt == max_attempts - 1
+        r: requests.Response | None = None
+        try:
+            r = session.post(url, headers=headers, json=payload, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            last_exc = exc
+            if last_attempt:
+                raise
+        else:
+            if r.status_code < 400:
+                return json_utils.loads(r.content)
+            if r.status_code not in RETRY_STATUS_CODES:
+                raise OpenAIHTTPError(r.text, status_code=r.status_code)
+
+        delay = _retry_delay_s(attempt, r)
+        if max_retry_wait_s is not None:
+            delay = min(delay, max(0.0, max_retry_wait_s - waited))
+            if delay <= 0.0 and waited >= max_retry_wait_s:
+                last_attempt = True
+        if last_attempt:
+            if r is None:
+                raise last_exc
+            if r.status_code == 429:
+                raise RateLimitError(r.text, retry_after_s=_parse_reset_header(r.headers.get("retry-after")))
+            raise OpenAIHTTPError(r.text, status_code=r.status_code)
+        time.sleep(delay)
+        waited += delay
+    raise RuntimeError("unreachable")
+
+
+def chat_completion(
+    payload: dict[str, Any],
+    cfg: OpenAIConfig,
+    *,
+    timeout: float = 60.0,
+    max_attempts: int = RETRY_MAX_ATTEMPTS,
+    max_retry_wait_s: float | None = RETRY_MAX_TOTAL_WAIT_S,
+) -> dict[str, Any]:
+    """POST a raw /chat/completions payload and return the decoded JSON response.
+
+    Goes through the shared keep-alive session and retries transient statuses. Interactive
+    callers should pass FAST_FAIL_MAX_ATTEMPTS/FAST_FAIL_MAX_RETRY_WAIT_S so a 429/5xx storm fails fast
+    instead of sleeping through server-hinted waits. Raises OpenAIHTTPError (RateLimitError for exhausted 429s) on API errors.
+    """
+
+    return _post_chat(
+        payload,
+        cfg,
+        timeout=timeout,
+        max_attempts=max_attempts,
+        max_retry_wait_s=max_retry_wait_s,
+    )
+
+
+def _message_content(data: dict[str, Any]) -> str:
     content = (((data.get("choices") or [{}])[0]).get("message") or {}).get("content")
     if not content:
         raise RuntimeError("OpenAI returned empty content")
+    return str(content)
 
-    import json
 
-    obj: dict[str, Any] = json.loads(content)
+def _parse_caption_content(content: str) -> tuple[str, str]:
+    obj: dict[str, Any] = json_utils.loads(content)
     caption = str(obj.get("caption", "")).strip()
     hashtags = str(obj.get("hashtags", "")).strip()
 
@@ -88,57 +285,23 @@ def generate_caption_and_hashtags(*, themes: list[str], track_id: str = "", nich
     return caption, hashtags
 
 
-def generate_final_caption(*, themes: list[str], niche: str, track_id: str, cfg: OpenAIConfig) -> str:
-    """Returns a human-facing caption ready to paste on TikTok/Reels.
+def generate_caption_and_hashtags(*, themes: list[str], track_id: str = "", niche: str, cfg: OpenAIConfig) -> tuple[str, str]:
+    """Returns (caption_line1, hashtags_line2). Uses cheapest default model.
 
-    The output is plain text (not JSON). It may include TrackID and hashtags in the body.
+    Requires OPENAI_API_KEY in environment.
     """
 
-    api_key = os.getenv(cfg.api_key_env, "").strip()
-    if not api_key:
-        raise RuntimeError(f"Missing {cfg.api_key_env} env var")
+    _require_api_key(cfg)
+    payload = _build_caption_payload(themes=themes, track_id=track_id, cfg=cfg)
+    return _parse_caption_content(_message_content(_post_chat(payload, cfg)))
 
-    url = f"{cfg.base_url.rstrip('/')}/chat/completions"
-    payload = {
-        "model": cfg.model,
-        "temperature": 1.0,
-        "messages": [
-            {
-                "role": "system",
-                "content": "You are a curator for an aesthetic house music channel. You write extremely minimalist, sophisticated captions inspired by the iconic song's soul. No emojis."
-            },
-            {
-                "role": "user",
-                "content": (
-                    f"Write a 1-line minimalist caption for a reel featuring the track: {track_id.replace('_', ' ')}.\n"
-                    f"Themes: {', '.join(themes)}.\n\n"
-                    "Rules:\n"
-                    "- 2 to 4 words total.\n"
-                    "- No artist or track names.\n"
-                    "- Be sensorial, abstract, or inspired by the song's meaning.\n"
-                    "- NO 'vibes', 'groove', 'energy', 'mood'.\n"
-                    "- Followed by 4-5 hashtags starting with #housemusic and ending with #fyp.\n"
-                    "Format: [Caption]. #hashtag1 #hashtag2 #fyp"
-                ),
-            }
-        ],
-    }
 
-    r = requests.post(
-        url,
-        headers={
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        },
-        json=payload,
-        timeout=60,
-    )
-    if r.status_code >= 400:
-        raise RuntimeError(r.text)
+def generate_final_caption(*, themes: list[str], niche: str, track_id: str, cfg: OpenAIConfig) -> str:
+    """Returns a human-facing caption ready to paste on TikTok/Reels.
 
-    data: dict[str, Any] = r.json()
-    content = (((data.get("choices") or [{}])[0]).get("message") or {}).get("content")
-    if not content:
-        raise RuntimeError("OpenAI returned empty content")
+    The output is plain text (not JSON). It may include TrackID and hashtags in the body.
+    """
 
-    return str(content).strip()
+    _require_api_key(cfg)
+    payload = _build_final_caption_payload(themes=themes, track_id=track_id, cfg=cfg)
+    return _message_content(_post_chat(payload, cfg)).strip()
@@ -3,19 +3,29 @@ from __future__ import annotations
 import json
 import os
 import platform
+import re
 import shutil
 import subprocess
 import sys
+import threading
 import zipfile
-from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from pathlib import Path
+from functools import lru_cache
+from pathlib import Path, PurePosixPath
 from typing import Any, Iterable
 
-import requests
+from core import json_utils
 
 
-@dataclass(frozen=True)
+RUN_FFMPEG_CHUNK_BYTES = 64 * 1024
+RUN_FFMPEG_TAIL_BYTES = 64 * 1024
+DOWNLOAD_RANGE_BYTES = 8 * 1024 * 1024
+DOWNLOAD_WORKERS = 6
+DOWNLOAD_COPY_BYTES = 4 * 1024 * 1024
+
+
+@dataclass(frozen=True, slots=True)
 class FFmpegBinaries:
     ffmpeg: str
     ffprobe: str
@@ -26,24 +36,26 @@ def _run_capture(args: list[str]) -> subprocess.CompletedProcess[str]:
 
 
 def ensure_ffmpeg(tools_dir: str) -> FFmpegBinaries:
-    """Locate FFmpeg/FFprobe; if missing, download a build into tools_dir/ffmpeg."""
+    """Locate FFmpeg/FFprobe; if missing, download a build into tools_dir/ffmpeg.
+
+    Memoized per absolute tools_dir: every render calls this, and the PATH lookups only
+    need to happen once per process. clear_ffmpeg_caps_cache() forgets the result.
+    """
+    return _ensure_ffmpeg_cached(os.path.abspath(tools_dir))
+
+
+@lru_cache(maxsize=4)
+def _ensure_ffmpeg_cached(tools_dir: str) -> FFmpegBinaries:
     tools_path = Path(tools_dir)
     sys_platform = platform.system().lower()
     is_win = sys_platform == "windows"
     suffix = ".exe" if is_win else ""
 
-    # 1. Try system PATH first, but VERIFY drawtext support
+    # 1. Try system PATH first (overlay text is rasterized with PIL, so no filter requirements)
     ffmpeg_in_path = shutil.which("ffmpeg")
     ffprobe_in_path = shutil.which("ffprobe")
     if ffmpeg_in_path and ffprobe_in_path:
-        try:
-            res = subprocess.run([ffmpeg_in_path, "-filters"], capture_output=True, text=True)
-            if "drawtext" in res.stdout:
-                return FFmpegBinaries(ffmpeg=ffmpeg_in_path, ffprobe=ffprobe_in_path)
-            else:
-                print(f"System FFmpeg at {ffmpeg_in_path} lacks 'drawtext' filter. Looking for a better one...")
-        except Exception:
-            pass
+        return FFmpegBinaries(ffmpeg=ffmpeg_in_path, ffprobe=ffprobe_in_path)
 
     # 2. Check local tools dir
     local_bin = tools_path / "ffmpeg" / "bin"
@@ -51,12 +63,7 @@ def ensure_ffmpeg(tools_dir: str) -> FFmpegBinaries:
     local_ffprobe = local_bin / f"ffprobe{suffix}"
     
     if local_ffmpeg.exists() and local_ffprobe.exists():
-        try:
-            res = subprocess.run([str(local_ffmpeg), "-filters"], capture_output=True, text=True)
-            if "drawtext" in res.stdout:
-                return FFmpegBinaries(ffmpeg=str(local_ffmpeg), ffprobe=str(local_ffprobe))
-        except Exception:
-            pass
+        return FFmpegBinaries(ffmpeg=str(local_ffmpeg), ffprobe=str(local_ffprobe))
 
     # 3. Download if needed
     tools_path.mkdir(parents=True, exist_ok=True)
@@ -69,77 +76,138 @@ def ensure_ffmpeg(tools_dir: str) -> FFmpegBinaries:
         url = "https://evermeet.cx/ffmpeg/getrelease/zip"
         archive = tools_path / "ffmpeg_macos.zip"
     else:
-        raise RuntimeError(f"FFmpeg with drawtext not found and auto-download not implemented for {sys_platform}")
+        raise RuntimeError(f"FFmpeg not found and auto-download not implemented for {sys_platform}")
 
     print(f"Downloading FFmpeg from {url}...")
-    with requests.get(url, stream=True, timeout=120) as r:
-        r.raise_for_status()
-        with open(archive, "wb") as f:
-            for chunk in r.iter_content(chunk_size=1024 * 1024):
-                if chunk:
-                    f.write(chunk)
-
-    extract_root = tools_path / "ffmpeg_temp"
-    if extract_root.exists():
-        shutil.rmtree(extract_root)
-    extract_root.mkdir(parents=True, exist_ok=True)
+    _download_file(url, archive)
 
+    # Extract only the binaries, streaming straight into their final location.
+    local_bin.mkdir(parents=True, exist_ok=True)
     print(f"Extracting {archive}...")
-    with zipfile.ZipFile(archive, "r") as z:
-        z.extractall(extract_root)
-
-    # Locate binaries in extracted files
-    if is_win:
-        candidates = list(extract_root.glob("**/bin/ffmpeg.exe"))
-    else:
-        # macOS zip from evermeet usually contains 'ffmpeg' at the root or in a folder
-        candidates = list(extract_root.glob("**/ffmpeg"))
-        # Filter out directories
-        candidates = [c for c in candidates if c.is_file() and not c.is_dir()]
-
-    if not candidates:
+    found = _extract_binaries(archive, local_bin, {local_ffmpeg.name, local_ffprobe.name}, require_bin_dir=is_win)
+    if local_ffmpeg.name not in found:
         raise RuntimeError(f"Could not find ffmpeg binary in {archive}")
 
-    target_ffmpeg = candidates[0]
-    
     # ffprobe is often a separate download on evermeet, but we'll check if it's there
-    target_ffprobe = target_ffmpeg.parent / f"ffprobe{suffix}"
-    
-    if not target_ffprobe.exists() and sys_platform == "darwin":
+    if local_ffprobe.name not in found and sys_platform == "darwin":
         print("FFprobe not found in ffmpeg zip, downloading separately...")
         probe_url = "https://evermeet.cx/ffmpeg/getrelease/ffprobe/zip"
         probe_archive = tools_path / "ffprobe_macos.zip"
-        with requests.get(probe_url, stream=True, timeout=120) as r:
-            with open(probe_archive, "wb") as f:
-                for chunk in r.iter_content(chunk_size=1024*1024): f.write(chunk)
-        with zipfile.ZipFile(probe_archive, "r") as z:
-            z.extractall(extract_root / "probe")
-        probe_candidates = list((extract_root / "probe").glob("**/ffprobe"))
-        if probe_candidates:
-            target_ffprobe = probe_candidates[0]
-
-    if not target_ffprobe.exists():
+        _download_file(probe_url, probe_archive)
+        found |= _extract_binaries(probe_archive, local_bin, {local_ffprobe.name})
+
+    if local_ffprobe.name not in found:
         # Fallback to system ffprobe if local one failed to download/extract
         system_ffprobe = shutil.which("ffprobe")
         if system_ffprobe:
-            target_ffprobe = Path(system_ffprobe)
+            shutil.copy2(system_ffprobe, local_ffprobe)
         else:
             raise RuntimeError("Could not find ffprobe binary.")
 
-    # Move to final location
-    local_bin.mkdir(parents=True, exist_ok=True)
-    shutil.move(str(target_ffmpeg), str(local_ffmpeg))
-    shutil.move(str(target_ffprobe), str(local_ffprobe))
-    
     # Permissions
     if not is_win:
         local_ffmpeg.chmod(0o755)
         local_ffprobe.chmod(0o755)
 
-    shutil.rmtree(extract_root)
+    # New binaries: only the capability listings need invalidating (this return value is lru_cached).
+    _clear_ffmpeg_caps_caches()
     return FFmpegBinaries(ffmpeg=str(local_ffmpeg), ffprobe=str(local_ffprobe))
 
 
+def _download_file(url: str, dest: Path) -> None:
+    """Download url to dest. Uses parallel HTTP Range requests when the server supports them.
+
+    Progress lives in dest.part plus a small JSON sidecar listing finished ranges, so an
+    interrupted download resumes instead of starting over. Falls back to a single stream.
+    """
+    # Only the auto-download path needs HTTP; probing/rendering never pays for importing requests.
+    import requests
+
+    part = dest.with_name(dest.name + ".part")
+    state_path = dest.with_name(dest.name + ".part.json")
+
+    size = 0
+    try:
+        head = requests.head(url, allow_redirects=True, timeout=30)
+        if head.ok and head.headers.get("Accept-Ranges", "").lower() == "bytes":
+            url = head.url
+            size = int(head.headers.get("Content-Length") or 0)
+    except (requests.RequestException, ValueError):
+        size = 0
+
+    if size < DOWNLOAD_RANGE_BYTES:
+        with requests.get(url, stream=True, timeout=120) as r:
+            r.raise_for_status()
+            r.raw.decode_content = True
+            with open(part, "wb") as f:
+                shutil.copyfileobj(r.raw, f, length=DOWNLOAD_COPY_BYTES)
+        os.replace(part, dest)
+        state_path.unlink(missing_ok=True)
+        return
+
+    ranges = [(lo, min(lo + DOWNLOAD_RANGE_BYTES, size) - 1) for lo in range(0, size, DOWNLOAD_RANGE_BYTES)]
+    done: set[int] = set()
+    try:
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+        if state.get("url") == url and state.get("size") == size and part.exists():
+            done = {int(i) for i in state.get("done", [])}
+    except (OSError, ValueError):
+        pass
+    if not done:
+        with open(part, "wb") as f:
+            f.truncate(size)
+
+    lock = threading.Lock()
+
+    def _save_state() -> None:
+        state_path.write_text(json.dumps({"url": url, "size": size, "done": sorted(done)}), encoding="utf-8")
+
+    def _fetch(index: int) -> None:
+        lo, hi = ranges[index]
+        with requests.get(url, headers={"Range": f"bytes={lo}-{hi}"}, stream=True, timeout=120) as r:
+            if r.status_code != 206:
+                raise RuntimeError(f"Server ignored Range request for {url} (HTTP {r.status_code})")
+            r.raw.decode_content = True
+            with open(part, "r+b") as f:
+                f.seek(lo)
+                shutil.copyfileobj(r.raw, f, length=DOWNLOAD_COPY_BYTES)
+                written = f.tell() - lo
+        if written != hi - lo + 1:
+            raise RuntimeError(f"Short read for bytes {lo}-{hi} of {url}")
+        with lock:
+            done.add(index)
+            _save_state()
+
+    pending = [i for i in range(len(ranges)) if i not in done]
+    with ThreadPoolExecutor(max_workers=min(DOWNLOAD_WORKERS, len(pending) or 1)) as pool:
+        for fut in [pool.submit(_fetch, i) for i in pending]:
+            fut.result()
+
+    os.replace(part, dest)
+    state_path.unlink(missing_ok=True)
+
+
+def _extract_binaries(archive: Path, dest_dir: Path, names: set[str], *, require_bin_dir: bool = False) -> set[str]:
+    """Stream matching zip members (by basename) into dest_dir; skips everything else in the archive."""
+    found: set[str] = set()
+    with zipfile.ZipFile(archive, "r") as z:
+        for info in z.infolist():
+            if info.is_dir():
+                continue
+            member = PurePosixPath(info.filename)
+            if member.name not in names or member.name in found:
+                continue
+            if require_bin_dir and member.parent.name != "bin":
+                continue
+            target = dest_dir / member.name
+            tmp = target.with_name(target.name + ".part")
+            with z.open(info) as src, open(tmp, "wb") as dst:
+                shutil.copyfileobj(src, dst, length=1024 * 1024)
+            os.replace(tmp, target)
+            found.add(member.name)
+    return found
+
+
 def ffprobe_json(ffprobe_path: str, media_path: str) -> dict[str, Any]:
     args = [
         ffprobe_path,
@@ -154,24 +222,47 @@ def ffprobe_json(ffprobe_path: str, media_path: str) -> dict[str, Any]:
     cp = _run_capture(args)
     if cp.returncode != 0:
         raise RuntimeError(f"ffprobe failed for {media_path}:\n{cp.stdout}")
-    return json.loads(cp.stdout)
+    return json_utils.loads(cp.stdout)
 
 
+@lru_cache(maxsize=8)
 def list_ffmpeg_encoders(ffmpeg_path: str) -> str:
     cp = _run_capture([ffmpeg_path, "-hide_banner", "-encoders"])
     return cp.stdout
 
 
+@lru_cache(maxsize=8)
 def list_ffmpeg_hwaccels(ffmpeg_path: str) -> str:
     cp = _run_capture([ffmpeg_path, "-hide_banner", "-hwaccels"])
     return cp.stdout
 
 
+@lru_cache(maxsize=8)
 def list_ffmpeg_filters(ffmpeg_path: str) -> str:
     cp = _run_capture([ffmpeg_path, "-hide_banner", "-filters"])
     return cp.stdout
 
 
+@lru_cache(maxsize=64)
+def has_ffmpeg_filter(ffmpeg_path: str, name: str) -> bool:
+    """Exact filter-name lookup in `ffmpeg -filters` (" TSC overlay  VV->V  ..." rows)."""
+    pattern = re.compile(rf"^\s*[A-Z.|]+\s+{re.escape(name)}\s", re.MULTILINE)
+    return pattern.search(list_ffmpeg_filters(ffmpeg_path)) is not None
+
+
+def _clear_ffmpeg_caps_caches() -> None:
+    has_ffmpeg_filter.cache_clear()
+    list_ffmpeg_encoders.cache_clear()
+    list_ffmpeg_hwaccels.cache_clear()
+    list_ffmpeg_filters.cache_clear()
+
+
+def clear_ffmpeg_caps_cache() -> None:
+    """Forget memoized binaries and -encoders/-hwaccels/-filters output (e.g. after swapping binaries)."""
+    _ensure_ffmpeg_cached.cache_clear()
+    _clear_ffmpeg_caps_caches()
+
+
 def run_ffmpeg(ffmpeg_path: str, args: list[str], *, stream_output: bool = True) -> None:
     """Run FFmpeg.
 
@@ -187,28 +278,39 @@ def run_ffmpeg(ffmpeg_path: str, args: list[str], *, stream_output: bool = True)
             raise RuntimeError(proc.stdout)
         return
 
-    # Stream output line-by-line for progress visibility.
-    # Keep a tail buffer for error reporting.
-    tail: deque[str] = deque(maxlen=300)
+    # Stream raw output chunks for progress visibility (no per-line Python work).
+    # Keep only a bounded byte tail for error reporting.
+    tail = bytearray()
 
-    proc = subprocess.Popen(
-        full,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1,
-        universal_newlines=True,
-    )
+    proc = subprocess.Popen(full, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
 
     assert proc.stdout is not None
-    for line in proc.stdout:
-        tail.append(line)
-        sys.stdout.write(line)
-        sys.stdout.flush()
+    sys.stdout.flush()
+    try:
+        out_fd: int | None = sys.stdout.fileno()
+    except (AttributeError, OSError, ValueError):
+        out_fd = None
+
+    in_fd = proc.stdout.fileno()
+    while True:
+        chunk = os.read(in_fd, RUN_FFMPEG_CHUNK_BYTES)
+        if not chunk:
+            break
+        if out_fd is not None:
+            # os.write may write less than asked (e.g. a full pipe): loop until the chunk is out.
+            view = memoryview(chunk)
+            while view:
+                view = view[os.write(out_fd, view):]
+        else:
+            sys.stdout.write(chunk.decode("utf-8", "replace"))
+        tail += chunk
+        if len(tail) > RUN_FFMPEG_TAIL_BYTES:
+            del tail[: len(tail) - RUN_FFMPEG_TAIL_BYTES]
+    proc.stdout.close()
 
     rc = proc.wait()
     if rc != 0:
-        raise RuntimeError("".join(tail))
+        raise RuntimeError(tail.decode("utf-8", "replace"))
 
 
 def safe_relpath(path: str, start: str) -> str:
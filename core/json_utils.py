@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import codecs
+import json
+from typing import Any
+
+try:  # Optional speedup: orjson parses/serializes several times faster than the stdlib.
+    import orjson as _orjson
+except ImportError:  # pragma: no cover - depends on environment
+    _orjson = None
+
+
+def loads(data: str | bytes | bytearray) -> Any:
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
+def loads_body(content: bytes, encoding: str | None = None) -> Any:
+    """Parse an HTTP JSON body like resp.json(): honours the response charset and a UTF-8 BOM."""
+    try:
+        codec = codecs.lookup(encoding).name if encoding else "utf-8"
+    except LookupError:
+        codec = "utf-8"
+    if codec == "utf-8" and not content.startswith(codecs.BOM_UTF8):
+        return loads(content)  # common case: hand the UTF-8 bytes straight to the parser
+    if codec == "utf-8":
+        codec = "utf-8-sig"
+    return loads(content.decode(codec).lstrip("\ufeff"))
+
+
+def looks_like_json_array(content: bytes) -> bool:
+    """Cheap sniff for WP JSON listings served with a non-JSON content-type (BOM tolerant)."""
+    return content.lstrip().removeprefix(codecs.BOM_UTF8).lstrip().startswith(b"[")
+
+
+def dumps(obj: Any, *, indent: int | None = None, sort_keys: bool = False) -> str:
+    """Serialize to a str (UTF-8, non-ASCII kept as-is). indent is 2 or None when orjson is used."""
+    if _orjson is not None and indent in (None, 2):
+        option = 0
+        if indent == 2:
+            option |= _orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= _orjson.OPT_SORT_KEYS
+        return _orjson.dumps(obj, option=option).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, indent=indent, sort_keys=sort_keys)
@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+import hashlib
+
+
+def stable_seed(text: str) -> int:
+    """Seed determinístico para escolher variações a partir de um texto.
+
+    Mesmo valor de int(md5(...).hexdigest(), 16) (mantém as escolhas já publicadas),
+    sem o ida-e-volta por string hexadecimal.
+    """
+    return int.from_bytes(hashlib.md5(text.encode("utf-8")).digest(), "big")
@@ -10,29 +10,46 @@ Flow:
 from __future__ import annotations
 
 import argparse
+import heapq
 import json
 import mimetypes
 import os
 import re
+import shutil
 import sys
+import tempfile
 import textwrap
+import threading
 import xml.etree.ElementTree as ET
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
 from typing import Any
 from urllib.parse import urlparse
 
 import requests
 import random
-import hashlib
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from core.ffmpeg_utils import ensure_ffmpeg, run_ffmpeg
-from core.ai_client import OpenAIConfig, is_openai_configured
+from core import json_utils
+from core.file_utils import write_text_atomic
+from core.ffmpeg_utils import ensure_ffmpeg, ffprobe_json, run_ffmpeg
+from core.ai_client import (
+    FAST_FAIL_MAX_ATTEMPTS,
+    FAST_FAIL_MAX_RETRY_WAIT_S,
+    OpenAIConfig,
+    OpenAIHTTPError,
+    chat_completion,
+    is_openai_configured,
+)
+from core.text_utils import stable_seed
 
 
 # CTAs (Call-to-Action) para rotação aleatória
@@ -104,6 +121,12 @@ CTA_BY_THEME = {
 HOOK_HISTORY_FILE = "hook_history.json"
 HOOK_HISTORY_WINDOW = 12
 HOOK_HISTORY_MAX = 120
+DOWNLOAD_COPY_BYTES = 1024 * 1024
+HTTP_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_http_session: requests.Session | None = None
+_http_session_lock = threading.Lock()
+_hook_history_lock = threading.Lock()
 
 HOOK_WRAP_WIDTH = 24
 HOOK_MAX_LINES = 2
@@ -129,28 +152,35 @@ LOGO_Y = 120
 BODY_LEFT_X = 56
 
 
+# Ordered (theme, keywords) rules: first theme with any keyword substring wins.
+NEWS_THEME_KEYWORDS: tuple[tuple[str, tuple[str, ...]], ...] = (
+    ("bbb", ("bbb", "big brother", "paredão", "paredao", "eliminação", "eliminacao",
+             "prova do líder", "prova do lider", "anjo", "confinamento")),
+    ("morte", ("morre", "morte", "luto", "velório", "velorio", "enterro", "falece")),
+    ("separacao", ("separ", "divórcio", "divorcio", "trai", "affair", "corno", "termina")),
+    ("namoro", ("namoro", "casal", "romance", "casamento", "noivar", "noivo", "noiva",
+                "juntinhos", "flagrad", "beij")),
+    ("treta", ("polêmica", "polemica", "briga", "treta", "confusão", "confusao",
+               "desabaf", "atac", "xing", "vingança", "vinganca")),
+    ("carnaval", ("carnaval", "bloco", "fantasia", "desfile", "abadá", "abada")),
+    ("gravidez", ("filha", "filho", "bebê", "bebe", "gravidez", "grávida", "gravida", "nasceu")),
+    ("policia", ("pres", "detenção", "detencao", "cadeia", "processo", "policia", "policial")),
+)
+
+# One compiled alternation per theme: a single C-level scan instead of a Python loop of `in` checks.
+_NEWS_THEME_PATTERNS: tuple[tuple[str, re.Pattern[str]], ...] = tuple(
+    (theme, re.compile("|".join(re.escape(k) for k in keywords)))
+    for theme, keywords in NEWS_THEME_KEYWORDS
+)
+
+
+@lru_cache(maxsize=1024)
 def _detect_news_theme(headline: str) -> str:
     """Detecta o tema da notícia para selecionar CTA e hook adequados."""
     h = headline.lower()
-    if any(k in h for k in ["bbb", "big brother", "paredão", "paredao", "eliminação", "eliminacao",
-                             "prova do líder", "prova do lider", "anjo", "confinamento"]):
-        return "bbb"
-    if any(k in h for k in ["morre", "morte", "luto", "velório", "velorio", "enterro", "falece"]):
-        return "morte"
-    if any(k in h for k in ["separ", "divórcio", "divorcio", "trai", "affair", "corno", "termina"]):
-        return "separacao"
-    if any(k in h for k in ["namoro", "casal", "romance", "casamento", "noivar", "noivo", "noiva",
-                             "juntinhos", "flagrad", "beij"]):
-        return "namoro"
-    if any(k in h for k in ["polêmica", "polemica", "briga", "treta", "confusão", "confusao",
-                             "desabaf", "atac", "xing", "vingança", "vinganca"]):
-        return "treta"
-    if any(k in h for k in ["carnaval", "bloco", "fantasia", "desfile", "abadá", "abada"]):
-        return "carnaval"
-    if any(k in h for k in ["filha", "filho", "bebê", "bebe", "gravidez", "grávida", "gravida", "nasceu"]):
-        return "gravidez"
-    if any(k in h for k in ["pres", "detenção", "detencao", "cadeia", "processo", "policia", "policial"]):
-        return "policia"
+    for theme, pattern in _NEWS_THEME_PATTERNS:
+        if pattern.search(h):
+            return theme
     return "generic"
 
 
@@ -169,19 +199,14 @@ def _get_random_cta(seed_text: str = "", headline: str = "") -> str:
     cta_pool = CTA_BY_THEME.get(theme, CTA_VARIATIONS_GENERIC)
     
     if seed_text:
-        hash_value = int(hashlib.md5(seed_text.encode()).hexdigest(), 16)
-        random.seed(hash_value)
-    
-    cta = random.choice(cta_pool)
-    
-    # Reset random seed para não afetar outros randoms
-    random.seed()
-    
-    return cta
+        # RNG local: determinístico por seed sem re-semear (e depois resetar) o random global.
+        return random.Random(stable_seed(seed_text)).choice(cta_pool)
+
+    return random.choice(cta_pool)
 
 
 def _sanitize_cta_text(cta: str) -> str:
-    """Remove emoji/symbol chars that often render as tofu (a square with X) in FFmpeg drawtext."""
+    """Remove emoji/symbol chars that often render as tofu (a square with X) in the overlay font."""
     t = _clean_text(cta)
     # Keep latin letters (incl. accents), digits, spaces and common punctuation.
     # This intentionally removes arrows/emojis like 👇 🔥 🔔 etc.
@@ -290,7 +315,7 @@ TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "").strip()
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "").strip()
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class NewsItem:
     source: str
     feed_url: str
@@ -311,14 +336,16 @@ def _clean_text(txt: str) -> str:
     return re.sub(r"\s+", " ", (txt or "")).strip()
 
 
+_FIRST_IMAGE_PATTERNS = (
+    re.compile(r"<meta[^>]+property=[\"']og:image[\"'][^>]+content=[\"']([^\"']+)", re.IGNORECASE),
+    re.compile(r"<meta[^>]+name=[\"']twitter:image[\"'][^>]+content=[\"']([^\"']+)", re.IGNORECASE),
+    re.compile(r"<img[^>]+src=[\"']([^\"']+)", re.IGNORECASE),
+)
+
+
 def _extract_first_img_from_html(html: str) -> str | None:
-    patterns = [
-        r"<meta[^>]+property=[\"']og:image[\"'][^>]+content=[\"']([^\"']+)",
-        r"<meta[^>]+name=[\"']twitter:image[\"'][^>]+content=[\"']([^\"']+)",
-        r"<img[^>]+src=[\"']([^\"']+)",
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, html or "", re.IGNORECASE)
+    for pattern in _FIRST_IMAGE_PATTERNS:
+        match = pattern.search(html or "")
         if match:
             url = match.group(1).strip()
             if url.startswith("http"):
@@ -334,17 +361,23 @@ def _strip_html(text: str) -> str:
     return _clean_text(t)
 
 
+_FEED_BOILERPLATE_SUFFIX_RES = (
+    re.compile(r"\bO post\b.*?\bapareceu primeiro em\b.*$", re.I),
+    re.compile(r"\bThe post\b.*?\bfirst appeared on\b.*$", re.I),
+    re.compile(r"\bLeia mais\b.*$", re.I),
+    re.compile(r"\bContinue reading\b.*$", re.I),
+)
+
+
 def _clean_description_boilerplate(text: str, *, title: str = "") -> str:
     """Remove RSS boilerplate fragments and duplicated lead chunks."""
     t = _clean_text(text)
     if not t:
         return t
 
-    # Common CMS feed suffixes.
-    t = re.sub(r"\bO post\b.*?\bapareceu primeiro em\b.*$", "", t, flags=re.I)
-    t = re.sub(r"\bThe post\b.*?\bfirst appeared on\b.*$", "", t, flags=re.I)
-    t = re.sub(r"\bLeia mais\b.*$", "", t, flags=re.I)
-    t = re.sub(r"\bContinue reading\b.*$", "", t, flags=re.I)
+    # Common CMS feed suffixes (applied in order: each cut narrows what the next one sees).
+    for pattern in _FEED_BOILERPLATE_SUFFIX_RES:
+        t = pattern.sub("", t)
 
     # Deduplicate repeated leading token blocks (e.g. "Piorou? Piorou? Defesa ...").
     tokens = [tk for tk in t.split() if tk]
@@ -364,17 +397,41 @@ def _clean_description_boilerplate(text: str, *, title: str = "") -> str:
     return t
 
 
+def _get_http_session() -> requests.Session:
+    """Sessão keep-alive compartilhada para feeds/artigos/imagens (um handshake TLS por host)."""
+    global _http_session
+    if _http_session is None:
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        with _http_session_lock:
+            if _http_session is None:
+                # Só GET/HEAD passam por aqui; 429 respeita Retry-After.
+                retry = Retry(total=2, backoff_factor=0.5, status_forcelist=HTTP_RETRY_STATUS_CODES, raise_on_status=False)
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retry)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _http_session = session
+    return _http_session
+
+
 def _extract_article_text(link: str) -> str:
     try:
         headers = {"User-Agent": "Mozilla/5.0 (compatible; GossipPostBot/1.0)"}
-        html = requests.get(link, headers=headers, timeout=30).text
+        html = _get_http_session().get(link, headers=headers, timeout=30).text
     except Exception:
         return ""
+    return _article_text_from_html(html)
+
+
+_HTML_PARAGRAPH_RE = re.compile(r"<p[^>]*>(.*?)</p>", re.I | re.S)
 
-    paragraphs = re.findall(r"<p[^>]*>(.*?)</p>", html, flags=re.I | re.S)
-    cleaned = [_strip_html(p) for p in paragraphs]
-    cleaned = [p for p in cleaned if len(p) >= 35]
-    text = " ".join(cleaned[:8])
+
+def _article_text_from_html(html: str) -> str:
+    # Páginas de portal têm dezenas de <p> (rodapé, comentários...): varre só até o 8º parágrafo útil.
+    cleaned = (_strip_html(m.group(1)) for m in _HTML_PARAGRAPH_RE.finditer(html))
+    text = " ".join(islice((p for p in cleaned if len(p) >= 35), 8))
     return _clean_text(text)[:1200]
 
 
@@ -408,7 +465,7 @@ def _fetch_news_from_url(url: str, source_name: str = "custom") -> NewsItem:
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         }
-        r = requests.get(url, headers=headers, timeout=20)
+        r = _get_http_session().get(url, headers=headers, timeout=20)
         r.raise_for_status()
         
         # Busca imagem (og:image)
@@ -455,18 +512,19 @@ def _fetch_first_news(feeds: list[tuple[str, str]], skip_titles: list[str] | Non
 
     for source_name, feed_url in feeds:
         try:
-            resp = requests.get(feed_url, headers=headers, timeout=30)
+            resp = _get_http_session().get(feed_url, headers=headers, timeout=30)
             resp.raise_for_status()
         except Exception:
             continue
 
-        body = resp.text or ""
+        content = resp.content or b""
         ctype = (resp.headers.get("content-type") or "").lower()
 
         # Some sources expose latest posts via WordPress JSON instead of RSS.
-        if "json" in ctype or body.lstrip().startswith("["):
+        # Parse the raw bytes once; only the RSS path needs the decoded text.
+        if "json" in ctype or json_utils.looks_like_json_array(content):
             try:
-                posts = resp.json()
+                posts = json_utils.loads_body(content, resp.encoding)
             except Exception:
                 continue
             if not isinstance(posts, list):
@@ -491,7 +549,7 @@ def _fetch_first_news(feeds: list[tuple[str, str]], skip_titles: list[str] | Non
 
                 if not image_url:
                     try:
-                        article_resp = requests.get(link, headers=headers, timeout=30)
+                        article_resp = _get_http_session().get(link, headers=headers, timeout=30)
                         article_resp.raise_for_status()
                         image_url = _extract_first_img_from_html(article_resp.text) or ""
                     except Exception:
@@ -510,7 +568,7 @@ def _fetch_first_news(feeds: list[tuple[str, str]], skip_titles: list[str] | Non
             continue
 
         try:
-            root = ET.fromstring(body)
+            root = ET.fromstring(resp.text or "")
         except Exception:
             continue
 
@@ -528,7 +586,7 @@ def _fetch_first_news(feeds: list[tuple[str, str]], skip_titles: list[str] | Non
             image_url = _image_from_item(item)
             if not image_url:
                 try:
-                    article_resp = requests.get(link, headers=headers, timeout=30)
+                    article_resp = _get_http_session().get(link, headers=headers, timeout=30)
                     article_resp.raise_for_status()
                     image_url = _extract_first_img_from_html(article_resp.text)
                 except Exception:
@@ -582,15 +640,17 @@ def _download_image(url: str, out_base: Path) -> Path:
     last_error: Exception | None = None
     for candidate in candidates:
         try:
-            with requests.get(candidate, headers=headers, stream=True, timeout=60) as r:
+            with _get_http_session().get(candidate, headers=headers, stream=True, timeout=60) as r:
                 r.raise_for_status()
                 ext = _guess_extension(candidate, r.headers.get("content-type", ""))
                 out_path = out_base.with_suffix(ext)
+                # copyfileobj no stream bruto (já descomprimido): leituras grandes, sem loop Python por chunk.
+                r.raw.decode_content = True
                 with open(out_path, "wb") as f:
-                    for chunk in r.iter_content(chunk_size=1024 * 1024):
-                        if chunk:
-                            f.write(chunk)
-            if out_path.exists() and out_path.stat().st_size >= 10 * 1024:
+                    shutil.copyfileobj(r.raw, f, length=DOWNLOAD_COPY_BYTES)
+                    written = f.tell()
+            # Tamanho já conhecido pela escrita: sem exists()/stat() extras.
+            if written >= 10 * 1024:
                 return out_path
         except Exception as exc:
             last_error = exc
@@ -670,7 +730,7 @@ def _fit_hook_to_overlay(
         return ""
 
     def _wrap_count(text: str) -> int:
-        return len(textwrap.wrap(text, width=max_chars, break_long_words=False, break_on_hyphens=False))
+        return _wrapped_line_count(text, max_chars)
 
     candidate_words = words[:]
     candidate = _trim_trailing_connectors(" ".join(candidate_words))
@@ -724,12 +784,21 @@ def _is_valid_ai_cta(text: str) -> bool:
     return bool(re.search(r"\b(COMENTA|CURTE|SALVA|SEGUE|MARCA|MANDA|CONTA)\b", t, flags=re.I))
 
 
+_HOOK_NON_WORD_RE = re.compile(r"[^\w\s]")
+_WORD_RE = re.compile(r"\w+")
+_HOOK_SPACES_RE = re.compile(r"\s+")
+_HOOK_PUNCT_DELETE_TABLE = str.maketrans("", "", "?!")
+
+
+# Os mesmos hook/headline/body passam várias vezes pelas checagens (morte, genérico, histórico)
+# a cada rodada de validação editorial: normaliza cada texto uma vez só.
+@lru_cache(maxsize=1024)
 def _normalize_hook_text(text: str) -> str:
     import unicodedata
 
     base = unicodedata.normalize("NFKD", (text or "")).encode("ascii", "ignore").decode("ascii")
-    base = re.sub(r"[^\w\s]", " ", base.upper())
-    return re.sub(r"\s+", " ", base).strip()
+    base = _HOOK_NON_WORD_RE.sub(" ", base.upper())
+    return _HOOK_SPACES_RE.sub(" ", base).strip()
 
 
 GENERIC_HOOK_PATTERNS_PT = [
@@ -739,13 +808,14 @@ GENERIC_HOOK_PATTERNS_PT = [
     "QUE BABADO",
     "DEU O QUE FALAR",
 ]
+_GENERIC_HOOK_RE = re.compile("|".join(re.escape(marker) for marker in GENERIC_HOOK_PATTERNS_PT))
 
 
 def _is_overgeneric_hook(hook: str) -> bool:
     normalized = _normalize_hook_text(hook)
     if not normalized:
         return True
-    return any(marker in normalized for marker in GENERIC_HOOK_PATTERNS_PT)
+    return _GENERIC_HOOK_RE.search(normalized) is not None
 
 
 def _generate_contextual_hook_with_ai(item: NewsItem, recent_hooks: list[str], fallback: str = "") -> str | None:
@@ -754,10 +824,6 @@ def _generate_contextual_hook_with_ai(item: NewsItem, recent_hooks: list[str], f
     if not is_openai_configured(cfg):
         return None
 
-    api_key = os.getenv(cfg.api_key_env, "").strip()
-    if not api_key:
-        return None
-
     is_pt = _is_portuguese_context(item.source, item.title)
     context = _clean_text(f"{item.title}. {item.description}")[:1200]
     recent = ", ".join(recent_hooks[-8:]) if recent_hooks else "nenhum"
@@ -805,15 +871,7 @@ def _generate_contextual_hook_with_ai(item: NewsItem, recent_hooks: list[str], f
     }
 
     try:
-        r = requests.post(
-            f"{cfg.base_url.rstrip('/')}/chat/completions",
-            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-            json=payload,
-            timeout=45,
-        )
-        if r.status_code >= 400:
-            return None
-        data = r.json()
+        data = chat_completion(payload, cfg, timeout=45, max_attempts=FAST_FAIL_MAX_ATTEMPTS, max_retry_wait_s=FAST_FAIL_MAX_RETRY_WAIT_S)
         content = (((data.get("choices") or [{}])[0]).get("message") or {}).get("content")
         if not content:
             return None
@@ -838,7 +896,7 @@ def _generate_contextual_hook_with_ai(item: NewsItem, recent_hooks: list[str], f
 
         if not line:
             return None
-        word_count = len([w for w in line.replace("?", "").replace("!", "").split() if w])
+        word_count = len(line.translate(_HOOK_PUNCT_DELETE_TABLE).split())
         if word_count < 5 or word_count > 10:
             return None
         if _looks_incomplete_pt_line(line):
@@ -852,17 +910,36 @@ def _generate_contextual_hook_with_ai(item: NewsItem, recent_hooks: list[str], f
         return None
 
 
+def _read_text_if_exists(path: Path | None) -> str:
+    # Um open só: arquivo ausente vira "" sem o stat extra de exists().
+    if path is None:
+        return ""
+    try:
+        return path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return ""
+
+
 def _load_recent_hook_history(history_path: Path, *, window: int = HOOK_HISTORY_WINDOW) -> list[str]:
-    if not history_path.exists():
+    try:
+        st = history_path.stat()
+    except OSError:
         return []
+    # O scheduler roda vários posts no mesmo processo: só relê o JSON quando o arquivo muda
+    # (_save_hook_to_history grava via os.replace, então mtime/size sempre mudam).
+    return list(_recent_hook_history_cached(str(history_path), st.st_mtime_ns, st.st_size, window))
+
+
+@lru_cache(maxsize=16)
+def _recent_hook_history_cached(history_path: str, mtime_ns: int, size: int, window: int) -> tuple[str, ...]:
     try:
-        raw = json.loads(history_path.read_text(encoding="utf-8"))
+        raw = json_utils.loads(Path(history_path).read_bytes())
     except Exception:
-        return []
+        return ()
 
     hooks = raw.get("hooks") if isinstance(raw, dict) else None
     if not isinstance(hooks, list):
-        return []
+        return ()
 
     recent: list[str] = []
     for entry in hooks[-window:]:
@@ -870,15 +947,21 @@ def _load_recent_hook_history(history_path: Path, *, window: int = HOOK_HISTORY_
             h = _normalize_hook_text(str(entry.get("hook") or ""))
             if h:
                 recent.append(h)
-    return recent
+    return tuple(recent)
 
 
 def _save_hook_to_history(history_path: Path, hook_text: str, *, title: str = "", source: str = "") -> None:
+    # Lê-modifica-grava: serializado para posts gerados em paralelo no mesmo processo.
+    with _hook_history_lock:
+        _save_hook_to_history_locked(history_path, hook_text, title=title, source=source)
+
+
+def _save_hook_to_history_locked(history_path: Path, hook_text: str, *, title: str, source: str) -> None:
     payload: dict[str, object]
     hooks: list[dict[str, str]]
     if history_path.exists():
         try:
-            payload = json.loads(history_path.read_text(encoding="utf-8"))
+            payload = json_utils.loads(history_path.read_bytes())
         except Exception:
             payload = {"version": 1, "hooks": []}
     else:
@@ -899,7 +982,7 @@ def _save_hook_to_history(history_path: Path, hook_text: str, *, title: str = ""
         }
     )
     payload["hooks"] = hooks[-HOOK_HISTORY_MAX:]
-    history_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    write_text_atomic(history_path, json_utils.dumps(payload, indent=2) + "\n")
 
 
 def _pick_first_existing_font(paths: list[Path | str], fallback: str) -> str:
@@ -910,6 +993,8 @@ def _pick_first_existing_font(paths: list[Path | str], fallback: str) -> str:
     return fallback
 
 
+# As fontes instaladas não mudam durante o processo: resolve cada lista uma vez só.
+@lru_cache(maxsize=1)
 def _select_hook_font() -> str:
     return _pick_first_existing_font(
         [
@@ -923,6 +1008,7 @@ def _select_hook_font() -> str:
     )
 
 
+@lru_cache(maxsize=1)
 def _select_body_font() -> str:
     return _pick_first_existing_font(
         [
@@ -952,13 +1038,21 @@ def _clamp(n: int, lo: int, hi: int) -> int:
     return max(lo, min(hi, n))
 
 
-def _ffmpeg_escape(path: str) -> str:
-    return (
-        path.replace("\\", "\\\\")
-        .replace(":", "\\:")
-        .replace("'", "\\'")
-        .replace(",", "\\,")
-    )
+# Tabela única para str.translate: normaliza caracteres que FFmpeg/fontes costumam falhar
+# em renderizar e remove caracteres de controle (mantém \n e \r), tudo em uma passada.
+_OVERLAY_TRANSLATE_TABLE = str.maketrans(
+    {
+        "\xa0": " ",  # espaços não-quebráveis (comuns em HTML)
+        "…": "...",
+        "“": '"',
+        "”": '"',
+        "‘": "'",
+        "’": "'",
+        "—": "-",
+        "–": "-",
+        **{chr(c): None for c in range(32) if chr(c) not in "\n\r"},
+    }
+)
 
 
 def _sanitize_overlay_text(text: str) -> str:
@@ -966,35 +1060,106 @@ def _sanitize_overlay_text(text: str) -> str:
     # We DO NOT remove accents anymore for better readability in Portuguese.
     if not text:
         return ""
-    
-    # Converte espaços não-quebráveis (comuns em HTML) em espaços normais
-    text = text.replace('\xa0', ' ')
-    
-    # Normaliza caracteres problemáticos que FFmpeg/Fontes costumam falhar em renderizar
-    # Substitui reticências (single char) por três pontos normais
-    text = text.replace('…', '...')
-    # Substitui aspas curvas por retas
-    text = text.replace('“', '"').replace('”', '"').replace('‘', "'").replace('’', "'")
-    # Substitui traços longos por hífens simples
-    text = text.replace('—', '-').replace('–', '-')
-
-    # Remove apenas caracteres de controle, mantém UTF-8 (acentos, pontuação básica)
-    # Filtro rigoroso para evitar caixinhas com X
-    sanitized = "".join(c for c in text if ord(c) >= 32 or c in "\n\r")
-    
-    return sanitized.strip()
+    return text.translate(_OVERLAY_TRANSLATE_TABLE).strip()
 
 
-def _ffmpeg_escape_text(text: str) -> str:
-    t = _sanitize_overlay_text(text)
-    return (
-        t.replace("\\", "\\\\")
-        .replace(":", "\\:")
-        .replace("'", "\\'")
-        .replace(",", "\\,")
-        .replace("%", "\\%")
-        .replace("\n", "\\n")
+@lru_cache(maxsize=32)
+def _load_overlay_font(font_path: str, size: int) -> Any:
+    from PIL import ImageFont
+
+    try:
+        return ImageFont.truetype(font_path, size)
+    except OSError:
+        try:
+            return ImageFont.load_default(size=size)
+        except TypeError:  # Pillow < 10.1
+            return ImageFont.load_default()
+
+
+def _draw_outlined_lines(
+    canvas: Any,
+    lines: list[str],
+    *,
+    font: Any,
+    start_y: int,
+    step: int,
+    x: int,
+    anchor: str,
+    border_w: int,
+    border_alpha: int,
+    shadow_y: int,
+    shadow_alpha: int,
+) -> Any:
+    """Draw the glyph shadow (offset by shadow_y), then white text with a black border."""
+    from PIL import Image, ImageDraw
+
+    shadow = Image.new("RGBA", canvas.size, (0, 0, 0, 0))
+    text = Image.new("RGBA", canvas.size, (0, 0, 0, 0))
+    shadow_draw = ImageDraw.Draw(shadow)
+    text_draw = ImageDraw.Draw(text)
+    for i, line in enumerate(lines):
+        line = _sanitize_overlay_text(line)
+        if not line:
+            continue
+        y = start_y + (i * step)
+        shadow_draw.text(
+            (x, y + shadow_y),
+            line,
+            font=font,
+            anchor=anchor,
+            fill=(0, 0, 0, shadow_alpha),
+        )
+        text_draw.text(
+            (x, y),
+            line,
+            font=font,
+            anchor=anchor,
+            fill=(255, 255, 255, 255),
+            stroke_width=border_w,
+            stroke_fill=(0, 0, 0, border_alpha),
+        )
+    canvas = Image.alpha_composite(canvas, shadow)
+    return Image.alpha_composite(canvas, text)
+
+
+def _render_overlay_text_png(layout: dict[str, Any]) -> Path:
+    """Rasterize hook + body lines once into a transparent 1080x1920 temp PNG.
+
+    FFmpeg then only alpha-blends this single frame. The caller unlinks the file.
+    """
+    from PIL import Image
+
+    canvas = Image.new("RGBA", (1080, 1920), (0, 0, 0, 0))
+    canvas = _draw_outlined_lines(
+        canvas,
+        list(layout["hook_lines"]),
+        font=_load_overlay_font(_select_hook_font(), int(layout["hook_font_size"])),
+        start_y=int(layout["hook_start_y"]),
+        step=int(layout["hook_line_step"]),
+        x=1080 // 2,
+        anchor="ma",
+        border_w=4,
+        border_alpha=250,
+        shadow_y=3,
+        shadow_alpha=184,
+    )
+    canvas = _draw_outlined_lines(
+        canvas,
+        list(layout["tarja_lines"]),
+        font=_load_overlay_font(_select_body_font(), int(layout["tarja_font_size"])),
+        start_y=int(layout["tarja_start_y"]),
+        step=int(layout["tarja_line_step"]),
+        x=BODY_LEFT_X,
+        anchor="la",
+        border_w=3,
+        border_alpha=245,
+        shadow_y=2,
+        shadow_alpha=173,
     )
+    fd, png_name = tempfile.mkstemp(prefix="overlay_text_", suffix=".png")
+    with os.fdopen(fd, "wb") as f:
+        canvas.save(f, format="PNG")
+    return Path(png_name)
 
 
 def _adjust_color_brightness(r: int, g: int, b: int, factor: float = 0.5) -> tuple[int, int, int]:
@@ -1008,34 +1173,37 @@ def _adjust_color_brightness(r: int, g: int, b: int, factor: float = 0.5) -> tup
 def _estimate_logo_bg_color(logo_path: Path) -> str:
     """Estimate a background hex color from logo border pixels and adjust brightness."""
     try:
-        from PIL import Image
+        from PIL import Image, ImageStat
 
         img = Image.open(logo_path).convert("RGBA")
-        px = img.load()
         w, h = img.size
-        samples: list[tuple[int, int, int]] = []
-
         band_x = max(1, w // 12)
         band_y = max(1, h // 12)
 
-        for x in range(w):
-            for y in list(range(0, band_y)) + list(range(max(0, h - band_y), h)):
-                r, g, b, a = px[x, y]
-                if a > 200:
-                    samples.append((r, g, b))
-
-        for y in range(h):
-            for x in list(range(0, band_x)) + list(range(max(0, w - band_x), w)):
-                r, g, b, a = px[x, y]
-                if a > 200:
-                    samples.append((r, g, b))
+        # Top/bottom full-width bands + left/right full-height bands (corners counted in both),
+        # only opaque pixels (alpha > 200). ImageStat does the per-pixel sums in C.
+        rgb = img.convert("RGB")
+        opaque = img.getchannel("A").point(lambda a: 255 if a > 200 else 0)
+        boxes = [
+            (0, 0, w, band_y),
+            (0, max(0, h - band_y), w, h),
+            (0, 0, band_x, h),
+            (max(0, w - band_x), 0, w, h),
+        ]
+        sums = [0.0, 0.0, 0.0]
+        count = 0
+        for box in boxes:
+            stat = ImageStat.Stat(rgb.crop(box), mask=opaque.crop(box))
+            if not stat.count[0]:
+                continue
+            count += stat.count[0]
+            for i in range(3):
+                sums[i] += stat.sum[i]
 
-        if not samples:
-            r, g, b = img.convert("RGB").resize((1, 1)).getpixel((0, 0))
+        if not count:
+            r, g, b = rgb.resize((1, 1)).getpixel((0, 0))
         else:
-            r = sum(c[0] for c in samples) // len(samples)
-            g = sum(c[1] for c in samples) // len(samples)
-            b = sum(c[2] for c in samples) // len(samples)
+            r, g, b = (int(round(v)) // count for v in sums)
 
         # Adjust brightness to make the color darker
         r, g, b = _adjust_color_brightness(r, g, b, factor=0.5)
@@ -1099,13 +1267,18 @@ def _layout_main_body_text(
     return fallback_lines[:max_lines], fallback_font, fallback_spacing
 
 
+PT_PORTAL_SOURCES = frozenset({"contigo", "ofuxico", "terra_gente", "ig_gente"})
+PT_HEADLINE_MARKERS = (" não ", " com ", " para ", " dos ", " das ", "você", "fofoca", "famosos", " é ", " o ", " a ")
+# Uma busca só em vez de 11 substrings (mesma semântica: qualquer marcador em qualquer posição).
+_PT_HEADLINE_MARKER_RE = re.compile("|".join(re.escape(marker) for marker in PT_HEADLINE_MARKERS))
+
+
 def _is_portuguese_context(source: str, headline: str) -> bool:
     # Strict check for BR portals
-    if source in {"contigo", "ofuxico", "terra_gente", "ig_gente"}:
+    if source in PT_PORTAL_SOURCES:
         return True
     h = _clean_text(headline).lower()
-    pt_markers = [" não ", " com ", " para ", " dos ", " das ", "você", "fofoca", "famosos", " é ", " o ", " a "]
-    return any(m in h for m in pt_markers)
+    return _PT_HEADLINE_MARKER_RE.search(h) is not None
 
 
 def _headline_for_overlay(headline: str, max_chars: int = 24, max_lines: int = 5) -> str:
@@ -1188,17 +1361,22 @@ def _collapse_duplicate_tokens(text: str) -> str:
     return t.strip()
 
 
+# Uma busca só para os quatro sinais de frase cortada: conectivo no fim, "e e"/"ou ou",
+# "E ISSO/E AGORA/ISSO" no fim e gerúndio no fim.
+_INCOMPLETE_PT_LINE_RE = re.compile(
+    r"\b(?:e|ou|de|do|da|no|na|em|com|para|por|que)\s*$"
+    r"|\b(?P<dup>e|ou)\s+(?P=dup)\b"
+    r"|\b(?:E ISSO|E AGORA|ISSO)\s*$"
+    r"|\b\w+(?:ando|endo|indo)\s*$",
+    re.I,
+)
+
+
 def _looks_incomplete_pt_line(text: str) -> bool:
     t = _clean_text(text)
     if not t:
         return True
-    if re.search(r"\b(e|ou|de|do|da|no|na|em|com|para|por|que)\s*$", t, flags=re.I):
-        return True
-    if re.search(r"\b(e|ou)\s+\1\b", t, flags=re.I):
-        return True
-    if re.search(r"\b(E ISSO|E AGORA|ISSO)\s*$", t, flags=re.I):
-        return True
-    if re.search(r"\b\w+(ando|endo|indo)\s*$", t, flags=re.I):
+    if _INCOMPLETE_PT_LINE_RE.search(t):
         return True
     if t.endswith(",") or t.endswith(".."):
         return True
@@ -1237,10 +1415,12 @@ def _extract_story_names(text: str, *, max_names: int = 2) -> list[str]:
         "Caso", "Brasil", "Gente", "Famosos",
     }
     names: list[str] = []
+    seen: set[str] = set()
     for candidate in candidates:
         if candidate in blocked:
             continue
-        if candidate not in names:
+        if candidate not in seen:
+            seen.add(candidate)
             names.append(candidate)
         if len(names) >= max_names:
             break
@@ -1250,7 +1430,7 @@ def _extract_story_names(text: str, *, max_names: int = 2) -> list[str]:
 def _pick_story_angle(item: NewsItem) -> str:
     angles = ["confronto", "consequencia", "estrategia", "reacao_publica", "virada"]
     seed = f"{item.title}|{item.link}|{item.source}"
-    idx = int(hashlib.md5(seed.encode("utf-8")).hexdigest(), 16) % len(angles)
+    idx = stable_seed(seed) % len(angles)
     return angles[idx]
 
 
@@ -1460,7 +1640,7 @@ def _fit_font_to_width(
     max_text_width_px: int,
     glyph_ratio: float = 0.56,
 ) -> int:
-    """Approximate drawtext width fit using longest line length."""
+    """Approximate overlay text width fit using longest line length."""
     if not lines:
         return target_font
     longest = max(len(line) for line in lines if line)
@@ -1470,6 +1650,24 @@ def _fit_font_to_width(
     return max(min_font, min(target_font, width_cap))
 
 
+def _wrapped_line_count(text: str, width: int) -> int:
+    """Line count textwrap.wrap(text, width, break_long_words=False, break_on_hyphens=False) would give.
+
+    Greedy packing over word lengths, without building the lines. Assumes whitespace
+    is already collapsed (e.g. via _clean_text).
+    """
+    count = 0
+    used = -1
+    for word in text.split():
+        n = len(word)
+        if used >= 0 and used + 1 + n <= width:
+            used += 1 + n
+        else:
+            count += 1
+            used = n
+    return count
+
+
 def _wrap_overlay_lines(text: str, *, width: int, max_lines: int | None = None, upper: bool = False) -> list[str]:
     clean = _clean_text(text)
     if upper:
@@ -1495,12 +1693,12 @@ def _estimate_overlay_body_line_count(text: str) -> int:
         return 0
     best_count = 10**6
     for width in range(BODY_WRAP_WIDTH, BODY_WRAP_MAX_WIDTH + 1):
-        lines = textwrap.wrap(clean, width=width, break_long_words=False, break_on_hyphens=False)
-        if not lines:
+        count = _wrapped_line_count(clean, width)
+        if not count:
             continue
-        best_count = min(best_count, len(lines))
-        if len(lines) <= BODY_MAX_LINES:
-            return len(lines)
+        best_count = min(best_count, count)
+        if count <= BODY_MAX_LINES:
+            return count
     return 0 if best_count == 10**6 else best_count
 
 
@@ -1512,21 +1710,24 @@ def _plan_overlay_layout(hook_text: str, body_text: str) -> dict[str, Any]:
         max_lines=HOOK_MAX_LINES,
         upper=True,
     ) or ["NOTICIA EM DESTAQUE"]
-    tarja_lines: list[str] = []
+    # Conta as linhas por largura e só quebra o texto de fato na largura escolhida.
+    body_upper = _clean_text(body_text).upper()
+    tarja_width: int | None = None
+    tarja_count = 0
     for width in range(BODY_WRAP_WIDTH, BODY_WRAP_MAX_WIDTH + 1):
-        candidate_lines = _wrap_overlay_lines(
-            body_text,
-            width=width,
-            max_lines=None,
-            upper=True,
-        )
-        if not candidate_lines:
+        count = _wrapped_line_count(body_upper, width)
+        if not count:
             continue
-        if (not tarja_lines) or (len(candidate_lines) < len(tarja_lines)):
-            tarja_lines = candidate_lines
-        if len(candidate_lines) <= BODY_MAX_LINES:
-            tarja_lines = candidate_lines
+        if tarja_width is None or count < tarja_count:
+            tarja_width, tarja_count = width, count
+        if count <= BODY_MAX_LINES:
+            tarja_width = width
             break
+    tarja_lines = (
+        _wrap_overlay_lines(body_text, width=tarja_width, max_lines=None, upper=True)
+        if tarja_width is not None
+        else []
+    )
     if not tarja_lines:
         tarja_lines = ["NOTICIA EM ATUALIZACAO"]
     elif len(tarja_lines) > BODY_MAX_LINES:
@@ -1677,31 +1878,30 @@ SEMANTIC_STOPWORDS_PT = {
     "eles", "elas", "tambem", "também", "ser", "estar", "foi", "era", "sao", "são", "tem", "teve",
     "das", "dos", "que", "com", "sem", "uma", "umas", "uns", "nos", "nas", "ele", "ela", "aqui",
 }
+_STORY_TOKEN_RE = re.compile(r"[A-Za-zÀ-ÖØ-öø-ÿ]{3,}")
 
 
-def _extract_story_keywords(item: NewsItem, *, max_terms: int = 16) -> list[str]:
+# A revisão editorial valida o mesmo item várias vezes (antes/depois de cada reescrita):
+# NewsItem é imutável, então os termos da matéria são calculados uma vez só.
+@lru_cache(maxsize=64)
+def _extract_story_keywords(item: NewsItem, *, max_terms: int = 16) -> tuple[str, ...]:
     raw = _clean_text(f"{item.title} {item.description}")
-    tokens = re.findall(r"[A-Za-zÀ-ÖØ-öø-ÿ]{3,}", raw.lower())
-    counts: dict[str, int] = {}
-    for token in tokens:
-        if token in SEMANTIC_STOPWORDS_PT:
-            continue
-        counts[token] = counts.get(token, 0) + 1
-    ordered = sorted(counts.items(), key=lambda kv: (-kv[1], -len(kv[0]), kv[0]))
-    return [k for k, _ in ordered[:max_terms]]
+    # Counter conta em C direto do filtro (sem o loop de dict.get por token).
+    counts = Counter(t for t in _STORY_TOKEN_RE.findall(raw.lower()) if t not in SEMANTIC_STOPWORDS_PT)
+    # Só os max_terms primeiros importam: seleção parcial em vez de ordenar o vocabulário inteiro.
+    top = heapq.nsmallest(max_terms, counts.items(), key=lambda kv: (-kv[1], -len(kv[0]), kv[0]))
+    return tuple(k for k, _ in top)
 
 
-def _story_overlap_count(text: str, keywords: list[str]) -> int:
+def _story_overlap_count(text: str, keywords: tuple[str, ...]) -> int:
     if not keywords:
         return 0
     t = _clean_text(text).lower()
     if not t:
         return 0
-    matches = 0
-    for keyword in keywords:
-        if re.search(rf"\b{re.escape(keyword)}\w*\b", t):
-            matches += 1
-    return matches
+    # Keyword casa se alguma palavra do texto começa com ela (mesmo que rf"\b{kw}\w*\b").
+    words = set(_WORD_RE.findall(t))
+    return sum(any(word.startswith(keyword) for word in words) for keyword in keywords)
 
 
 def _coerce_editorial_fields(
@@ -1823,12 +2023,7 @@ def _review_editorial_with_ai(
     if not is_openai_configured(cfg):
         return None, "openai_nao_configurado"
 
-    api_key = os.getenv(cfg.api_key_env, "").strip()
-    if not api_key:
-        return None, "api_key_ausente"
-
     model = os.getenv("GOSSIP_REVIEW_MODEL", os.getenv("GOSSIP_SUMMARY_MODEL", cfg.model)).strip() or cfg.model
-    url = f"{cfg.base_url.rstrip('/')}/chat/completions"
     context = _clean_text(f"{item.title}. {_clean_description_boilerplate(item.description, title=item.title)}")[:2200]
     messages: list[dict[str, str]] = [
         {
@@ -1870,15 +2065,10 @@ def _review_editorial_with_ai(
             "messages": messages,
         }
         try:
-            r = requests.post(
-                url,
-                headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-                json=payload,
-                timeout=60,
-            )
-            if r.status_code >= 400:
-                return None, f"http_{r.status_code}"
-            data = r.json()
+            try:
+                data = chat_completion(payload, cfg, max_attempts=FAST_FAIL_MAX_ATTEMPTS, max_retry_wait_s=FAST_FAIL_MAX_RETRY_WAIT_S)
+            except OpenAIHTTPError as exc:
+                return None, f"http_{exc.status_code}"
             content = (((data.get("choices") or [{}])[0]).get("message") or {}).get("content")
             obj = _extract_json_object_from_text(str(content or ""))
             if not obj:
@@ -2010,6 +2200,12 @@ def _run_editorial_review_gate(
     }, review
 
 
+_V5_LABEL_PREFIX_RE = re.compile(
+    r"^(gancho|hook|headline|titulo|title|corpo|body|tarja|descricao|descrição|description|cta)\s*[:\-–—=]\s*",
+    flags=re.I,
+)
+
+
 def _extract_v5_lines(raw: str) -> list[str]:
     lines: list[str] = []
     for ln in str(raw or "").splitlines():
@@ -2018,15 +2214,12 @@ def _extract_v5_lines(raw: str) -> list[str]:
             continue
         if t.startswith("#"):
             continue
-        t = re.sub(
-            r"^(gancho|hook|headline|titulo|title|corpo|body|tarja|descricao|descrição|description|cta)\s*[:\-–—=]\s*",
-            "",
-            t,
-            flags=re.I,
-        ).strip()
+        t = _V5_LABEL_PREFIX_RE.sub("", t).strip()
         if t:
             lines.append(" ".join(t.split()))
-    return lines[:5]
+            if len(lines) == 5:
+                break
+    return lines
 
 
 def _validate_v5_lines(lines: list[str], *, is_pt: bool) -> tuple[bool, str]:
@@ -2074,9 +2267,6 @@ def _summarize_news_text(item: NewsItem) -> str:
     summary_model = os.getenv("GOSSIP_SUMMARY_MODEL", cfg.model).strip()
     if is_openai_configured(cfg):
         try:
-            api_key = os.getenv(cfg.api_key_env, "").strip()
-            url = f"{cfg.base_url.rstrip('/')}/chat/completions"
-            
             if is_pt:
                 system_instr = (
                     "Voce cria textos no formato editorial Babado Rapido V5 para Shorts de fofoca.\n\n"
@@ -2144,15 +2334,10 @@ def _summarize_news_text(item: NewsItem) -> str:
                     "max_completion_tokens": 260,
                     "messages": messages,
                 }
-                r = requests.post(
-                    url,
-                    headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-                    json=payload,
-                    timeout=60,
-                )
-                if r.status_code >= 400:
+                try:
+                    data = chat_completion(payload, cfg, max_attempts=FAST_FAIL_MAX_ATTEMPTS, max_retry_wait_s=FAST_FAIL_MAX_RETRY_WAIT_S)
+                except OpenAIHTTPError:
                     break
-                data = r.json()
                 content = (((data.get("choices") or [{}])[0]).get("message") or {}).get("content")
                 if not content:
                     break
@@ -2296,9 +2481,6 @@ def _rewrite_overlay_body_if_needed(text: str, *, item: NewsItem) -> str:
         return t2 or t
 
     try:
-        api_key = os.getenv(cfg.api_key_env, "").strip()
-        url = f"{cfg.base_url.rstrip('/')}/chat/completions"
-
         context = _clean_text(f"{item.title}. {item.description}")
         context = context[:1600]
 
@@ -2332,15 +2514,7 @@ def _rewrite_overlay_body_if_needed(text: str, *, item: NewsItem) -> str:
             ],
         }
 
-        r = requests.post(
-            url,
-            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-            json=payload,
-            timeout=60,
-        )
-        if r.status_code >= 400:
-            return t
-        data = r.json()
+        data = chat_completion(payload, cfg, max_attempts=FAST_FAIL_MAX_ATTEMPTS, max_retry_wait_s=FAST_FAIL_MAX_RETRY_WAIT_S)
         out = (((data.get("choices") or [{}])[0]).get("message") or {}).get("content")
         if not out:
             return t
@@ -2366,17 +2540,13 @@ def _render_short(
     layout_plan: dict[str, Any] | None = None,
 ) -> None:
     ff = ensure_ffmpeg("tools")
-    hook_font = _ffmpeg_escape(_select_hook_font())
-    body_font = _ffmpeg_escape(_select_body_font())
     fade_out_start = max(0.0, duration_s - 1.2)
-    (out_video.parent / "_overlay_text").mkdir(parents=True, exist_ok=True)
 
-    main_path = summary_file or headline_file
-    body_raw = main_path.read_text(encoding="utf-8") if main_path.exists() else ""
+    headline_raw = _read_text_if_exists(headline_file)
+    body_raw = _read_text_if_exists(summary_file) if summary_file else headline_raw
     body_clean = _sanitize_overlay_text(body_raw).replace("\xa0", " ")
-    hook_raw = hook_file.read_text(encoding="utf-8") if hook_file and hook_file.exists() else ""
+    hook_raw = _read_text_if_exists(hook_file)
     hook_clean = _sanitize_overlay_text(hook_raw).replace("\xa0", " ")
-    headline_raw = headline_file.read_text(encoding="utf-8") if headline_file.exists() else ""
     headline_clean = _sanitize_overlay_text(headline_raw).replace("\xa0", " ")
 
     if not hook_clean:
@@ -2398,55 +2568,20 @@ def _render_short(
         hook_text=hook_clean,
         body_text=tarja_text,
     )
-    hook_lines = resolved_layout["hook_lines"]
-    tarja_lines = resolved_layout["tarja_lines"]
-    hook_size = resolved_layout["hook_font_size"]
-    hook_step = resolved_layout["hook_line_step"]
-    hook_start_y = resolved_layout["hook_start_y"]
-    tarja_size = resolved_layout["tarja_font_size"]
-    tarja_step = resolved_layout["tarja_line_step"]
-    tarja_start_y = resolved_layout["tarja_start_y"]
-
-    text_layers: list[str] = []
-    for i, line in enumerate(hook_lines):
-        line_esc = _ffmpeg_escape_text(line)
-        y_pos = hook_start_y + (i * hook_step)
-        text_layers.append(
-            f"drawtext=text='{line_esc}':fontfile='{hook_font}':fontcolor=white:"
-            f"fontsize={hook_size}:borderw=4:bordercolor=black@0.98:"
-            "shadowcolor=black@0.72:shadowx=0:shadowy=3:"
-            f"x=(w-tw)/2:y={y_pos}"
-        )
-
-    for i, line in enumerate(tarja_lines):
-        line_esc = _ffmpeg_escape_text(line)
-        y_pos = tarja_start_y + (i * tarja_step)
-        text_layers.append(
-            f"drawtext=text='{line_esc}':fontfile='{body_font}':fontcolor=white:"
-            f"fontsize={tarja_size}:borderw=3:bordercolor=black@0.96:shadowcolor=black@0.68:shadowx=0:shadowy=2:"
-            f"x={BODY_LEFT_X}:y={y_pos}"
-        )
-
-    base_motion_graph = ",".join(
-        [
-            _build_subtle_parallax_blur_graph(),
-            *_build_subtle_image_zoom_filters(duration_s, fps=30),
-            *text_layers,
-        ]
-    ) + "[post]"
+    text_png: Path | None = None
+    try:
+        text_png = _render_overlay_text_png(resolved_layout)
 
-    out_video.parent.mkdir(parents=True, exist_ok=True)
+        base_motion_graph = ",".join(
+            [
+                _build_subtle_parallax_blur_graph(),
+                *_build_subtle_image_zoom_filters(duration_s, fps=30),
+            ]
+        ) + "[motion];[motion][1:v]overlay=0:0[post]"
 
-    if logo_path is not None and logo_path.exists():
-        overlay_graph = (
-            f"{base_motion_graph};"
-            "[1:v]scale=300:-1:flags=lanczos[logo];"
-            f"[post][logo]overlay=(W-w)/2:{LOGO_Y}[v]"
-        )
+        out_video.parent.mkdir(parents=True, exist_ok=True)
 
-        args = [
-            "-hide_banner",
-            "-y",
+        input_args = [
             "-loop",
             "1",
             "-framerate",
@@ -2456,64 +2591,33 @@ def _render_short(
             "-i",
             str(image_path),
             "-i",
-            str(logo_path),
-            "-f",
-            "lavfi",
-            "-t",
-            str(duration_s),
-            "-i",
-            "sine=frequency=247:sample_rate=44100",
-            "-filter_complex",
-            overlay_graph,
-            "-map",
-            "[v]",
-            "-map",
-            "2:a:0",
-            "-r",
-            "30",
-            "-c:v",
-            "libx264",
-            "-c:a",
-            "aac",
-            "-b:a",
-            "96k",
-            "-af",
-            f"volume=0.06,lowpass=f=1200,afade=t=in:st=0:d=1.0,afade=t=out:st={fade_out_start:.1f}:d=1.2",
-            "-preset",
-            "medium",
-            "-crf",
-            "20",
-            "-pix_fmt",
-            "yuv420p",
-            "-shortest",
-            "-movflags",
-            "+faststart",
-            str(out_video),
+            str(text_png),
         ]
-    else:
+        if logo_path is not None and logo_path.exists():
+            input_args += ["-i", str(logo_path)]
+            filter_graph = (
+                f"{base_motion_graph};"
+                "[2:v]scale=300:-1:flags=lanczos[logo];"
+                f"[post][logo]overlay=(W-w)/2:{LOGO_Y}[v]"
+            )
+            video_label = "[v]"
+        else:
+            filter_graph = base_motion_graph
+            video_label = "[post]"
+        # Trilha ambiente (seno) é sempre a última entrada.
+        audio_index = input_args.count("-i")
+        input_args += ["-f", "lavfi", "-t", str(duration_s), "-i", "sine=frequency=247:sample_rate=44100"]
+
         args = [
             "-hide_banner",
             "-y",
-            "-loop",
-            "1",
-            "-framerate",
-            "30",
-            "-t",
-            str(duration_s),
-            "-i",
-            str(image_path),
-            "-f",
-            "lavfi",
-            "-t",
-            str(duration_s),
-            "-i",
-            "sine=frequency=247:sample_rate=44100",
+            *input_args,
             "-filter_complex",
-            base_motion_graph,
+            filter_graph,
             "-map",
-            "[post]",
+            video_label,
             "-map",
-            "1:a:0",
+            f"{audio_index}:a:0",
             "-r",
             "30",
             "-c:v",
@@ -2535,7 +2639,22 @@ def _render_short(
             "+faststart",
             str(out_video),
         ]
-    run_ffmpeg(ff.ffmpeg, args, stream_output=False)
+        run_ffmpeg(ff.ffmpeg, args, stream_output=False)
+    finally:
+        if text_png is not None:
+            text_png.unlink(missing_ok=True)
+
+
+def _probe_audio_codec(ffprobe_path: str, media_path: Path) -> str:
+    """codec_name do primeiro stream de áudio ("" se não houver ou o probe falhar)."""
+    try:
+        probe = ffprobe_json(ffprobe_path, str(media_path))
+    except Exception:
+        return ""
+    for stream in probe.get("streams") or []:
+        if stream.get("codec_type") == "audio":
+            return str(stream.get("codec_name") or "").lower()
+    return ""
 
 
 def _render_short_video(
@@ -2555,15 +2674,12 @@ def _render_short_video(
     Corta o vídeo em `duration_s` segundos (default 20s).
     """
     ff = ensure_ffmpeg("tools")
-    hook_font = _ffmpeg_escape(_select_hook_font())
-    body_font = _ffmpeg_escape(_select_body_font())
 
-    main_path = summary_file or headline_file
-    body_raw = main_path.read_text(encoding="utf-8") if main_path.exists() else ""
+    headline_raw = _read_text_if_exists(headline_file)
+    body_raw = _read_text_if_exists(summary_file) if summary_file else headline_raw
     body_clean = _sanitize_overlay_text(body_raw).replace("\xa0", " ")
-    hook_raw = hook_file.read_text(encoding="utf-8") if hook_file and hook_file.exists() else ""
+    hook_raw = _read_text_if_exists(hook_file)
     hook_clean = _sanitize_overlay_text(hook_raw).replace("\xa0", " ")
-    headline_raw = headline_file.read_text(encoding="utf-8") if headline_file.exists() else ""
     headline_clean = _sanitize_overlay_text(headline_raw).replace("\xa0", " ")
     if not hook_clean:
         hook_clean = _build_v5_fallback_hook(
@@ -2584,104 +2700,59 @@ def _render_short_video(
         hook_text=hook_clean,
         body_text=tarja_text,
     )
-    hook_lines = resolved_layout["hook_lines"]
-    tarja_lines = resolved_layout["tarja_lines"]
-    hook_size = resolved_layout["hook_font_size"]
-    hook_step = resolved_layout["hook_line_step"]
-    hook_start_y = resolved_layout["hook_start_y"]
-    tarja_size = resolved_layout["tarja_font_size"]
-    tarja_step = resolved_layout["tarja_line_step"]
-    tarja_start_y = resolved_layout["tarja_start_y"]
-
-    text_filters: list[str] = []
-    for i, line in enumerate(hook_lines):
-        line_esc = _ffmpeg_escape_text(line)
-        y_pos = hook_start_y + (i * hook_step)
-        text_filters.append(
-            f"drawtext=text='{line_esc}':fontfile='{hook_font}':fontcolor=white:"
-            f"fontsize={hook_size}:borderw=4:bordercolor=black@0.98:"
-            "shadowcolor=black@0.72:shadowx=0:shadowy=3:"
-            f"x=(w-tw)/2:y={y_pos}"
-        )
-
-    for i, line in enumerate(tarja_lines):
-        line_esc = _ffmpeg_escape_text(line)
-        y_pos = tarja_start_y + (i * tarja_step)
-        text_filters.append(
-            f"drawtext=text='{line_esc}':fontfile='{body_font}':fontcolor=white:"
-            f"fontsize={tarja_size}:borderw=3:bordercolor=black@0.96:shadowcolor=black@0.68:shadowx=0:shadowy=2:"
-            f"x={BODY_LEFT_X}:y={y_pos}"
-        )
+    text_png: Path | None = None
+    try:
+        text_png = _render_overlay_text_png(resolved_layout)
 
-    scale_filters = [
-        "scale=1080:1920:force_original_aspect_ratio=decrease",
-        "pad=1080:1920:(ow-iw)/2:(oh-ih)/2:color=0x0B0B0B",
-        "setsar=1",
-        "format=yuv420p",
-    ]
+        scale_filters = [
+            "scale=1080:1920:force_original_aspect_ratio=decrease",
+            "pad=1080:1920:(ow-iw)/2:(oh-ih)/2:color=0x0B0B0B",
+            "setsar=1",
+            "format=yuv420p",
+        ]
+        base_graph = f"[0:v]{','.join(scale_filters)}[base];[base][1:v]overlay=0:0[bg]"
 
-    out_video.parent.mkdir(parents=True, exist_ok=True)
+        out_video.parent.mkdir(parents=True, exist_ok=True)
 
-    if logo_path is not None and logo_path.exists():
-        base_filters = ",".join(scale_filters)
-        text_only = ",".join(text_filters)
-        overlay_graph = (
-            f"[0:v]{base_filters},{text_only}[bg];"
-            "[1:v]scale=300:-1:flags=lanczos[logo];"
-            f"[bg][logo]overlay=(W-w)/2:{LOGO_Y}[v]"
-        )
-        args = [
-            "-hide_banner",
-            "-y",
+        input_args = [
             "-t",
-            str(int(duration_s)),
+            f"{duration_s:.3f}",
             "-i",
             str(video_path),
             "-i",
-            str(logo_path),
-            "-filter_complex",
-            overlay_graph,
-            "-map",
-            "[v]",
-            "-map",
-            "0:a?",
-            "-c:v",
-            "libx264",
-            "-c:a",
-            "aac",
-            "-b:a",
-            "128k",
-            "-preset",
-            "medium",
-            "-crf",
-            "20",
-            "-pix_fmt",
-            "yuv420p",
-            "-movflags",
-            "+faststart",
-            str(out_video),
+            str(text_png),
         ]
-    else:
-        vf = ",".join(scale_filters + text_filters)
+        if logo_path is not None and logo_path.exists():
+            input_args += ["-i", str(logo_path)]
+            filter_graph = (
+                f"{base_graph};"
+                "[2:v]scale=300:-1:flags=lanczos[logo];"
+                f"[bg][logo]overlay=(W-w)/2:{LOGO_Y}[v]"
+            )
+            video_label = "[v]"
+        else:
+            filter_graph = base_graph
+            video_label = "[bg]"
+
+        # Áudio já em AAC (caso comum em mp4 baixado) vai direto para o container, sem decode+encode.
+        if _probe_audio_codec(ff.ffprobe, video_path) == "aac":
+            audio_codec_args = ["-c:a", "copy"]
+        else:
+            audio_codec_args = ["-c:a", "aac", "-b:a", "128k"]
+
         args = [
             "-hide_banner",
             "-y",
-            "-t",
-            str(int(duration_s)),
-            "-i",
-            str(video_path),
-            "-vf",
-            vf,
+            *input_args,
+            "-filter_complex",
+            filter_graph,
             "-map",
-            "0:v:0",
+            video_label,
             "-map",
             "0:a?",
             "-c:v",
             "libx264",
-            "-c:a",
-            "aac",
-            "-b:a",
-            "128k",
+            *audio_codec_args,
             "-preset",
             "medium",
             "-crf",
@@ -2692,62 +2763,90 @@ def _render_short_video(
             "+faststart",
             str(out_video),
         ]
-    run_ffmpeg(ff.ffmpeg, args, stream_output=False)
+        run_ffmpeg(ff.ffmpeg, args, stream_output=False)
+    finally:
+        if text_png is not None:
+            text_png.unlink(missing_ok=True)
+
+
+_V5_SEPARATOR_RE = re.compile(r"^-{2,}$")
+_V5_VARIANT_RE = re.compile(
+    r"^(variante|variation|vers[ãa]o|version|op[çc][ãa]o|option)\s*\d*\s*[:\-–—]*\s*",
+    flags=re.I,
+)
+_V5_LABEL_RE = re.compile(
+    r"^(gancho|hook|headline|titulo|title|corpo|body|tarja|descricao|descrição|description|cta)\s*[:\-–—=]\s*(.+)$",
+    flags=re.I,
+)
+_V5_LINE_PREFIX_RE = re.compile(r"^(linha|line)\s*\d*\s*[:\-–—=]\s*", flags=re.I)
+_V5_LABEL_FIELDS = {
+    "gancho": "hook",
+    "hook": "hook",
+    "headline": "headline",
+    "titulo": "headline",
+    "title": "headline",
+    "corpo": "body",
+    "body": "body",
+    "tarja": "body",
+    "descricao": "description",
+    "descrição": "description",
+    "description": "description",
+    "cta": "cta",
+}
+
+
+def _prepare_overlay_body(body: str, item: NewsItem) -> str:
+    body_text_clean = re.sub(r"#\w+", "", body).strip()
+    body_text_clean = re.sub(r"[^\w\s\u00C0-\u00FF.,;:?!-]", "", body_text_clean)
+    body_text_clean = re.sub(r"\s+", " ", body_text_clean).strip()
+    body_text_clean = _ensure_contextual_body_line(body_text_clean, item)
+    body_text_clean = _rewrite_overlay_body_if_needed(body_text_clean, item=item)
+    body_text_clean = _build_tarja_text(body_text_clean, item=item)
+    if _looks_incomplete_pt_line(body_text_clean):
+        body_text_clean = _build_tarja_text(_build_v5_fallback_body(item), item=item)
+    return body_text_clean
 
 
 def build_editorial_pack_for_item(
     item: NewsItem,
     *,
     hook_history_path: Path | None = None,
+    save_hook_history: bool = True,
 ) -> dict[str, Any]:
     """Build V5 editorial lines (hook/headline/body/description/cta) for a NewsItem.
 
     This is shared across scheduler and Telegram video flows to keep copy quality consistent.
+    With save_hook_history=False the caller records the hook itself (e.g. only after the
+    rest of the post succeeded).
     """
     raw_script = _summarize_news_text(item)
-    all_lines = [ln.rstrip() for ln in raw_script.splitlines()]
-
-    hashtags = " ".join([ln.lower() for ln in all_lines if ln.strip().startswith("#")])
 
+    # Uma passada só: hashtags, campos rotulados e linhas de conteúdo saem do mesmo loop.
+    hashtag_lines: list[str] = []
     content_lines: list[str] = []
     parsed_fields: dict[str, str] = {}
-    for ln in all_lines:
+    for ln in raw_script.splitlines():
         stripped = ln.strip()
         if not stripped:
             continue
         if stripped.startswith("#"):
+            hashtag_lines.append(ln.rstrip().lower())
             continue
-        if re.match(r"^-{2,}$", stripped):
+        if _V5_SEPARATOR_RE.match(stripped):
             continue
-        if re.match(
-            r"^(variante|variation|vers[ãa]o|version|op[çc][ãa]o|option)\s*\d*\s*[:\-–—]*\s*",
-            stripped,
-            flags=re.I,
-        ):
+        if _V5_VARIANT_RE.match(stripped):
             continue
-        labeled = re.match(
-            r"^(gancho|hook|headline|titulo|title|corpo|body|tarja|descricao|descrição|description|cta)\s*[:\-–—=]\s*(.+)$",
-            stripped,
-            flags=re.I,
-        )
+        labeled = _V5_LABEL_RE.match(stripped)
         if labeled:
-            key = labeled.group(1).lower()
-            value = labeled.group(2).strip()
-            if key in {"gancho", "hook"}:
-                parsed_fields["hook"] = value
-            elif key in {"headline", "titulo", "title"}:
-                parsed_fields["headline"] = value
-            elif key in {"corpo", "body", "tarja"}:
-                parsed_fields["body"] = value
-            elif key in {"descricao", "descrição", "description"}:
-                parsed_fields["description"] = value
-            elif key == "cta":
-                parsed_fields["cta"] = value
+            field = _V5_LABEL_FIELDS.get(labeled.group(1).lower())
+            if field:
+                parsed_fields[field] = labeled.group(2).strip()
             continue
 
-        cleaned = re.sub(r"^(linha|line)\s*\d*\s*[:\-–—=]\s*", "", stripped, flags=re.I).strip()
+        cleaned = _V5_LINE_PREFIX_RE.sub("", stripped).strip()
         if cleaned:
             content_lines.append(cleaned)
+    hashtags = " ".join(hashtag_lines)
 
     ai_cta = parsed_fields.get("cta", "")
     hook = parsed_fields.get("hook", "")
@@ -2784,38 +2883,36 @@ def build_editorial_pack_for_item(
         else []
     )
 
-    ai_hook = _generate_contextual_hook_with_ai(item, recent_hooks, fallback=hook_clean)
-    if ai_hook:
-        hook_clean = ai_hook
+    # O corpo (com possível reescrita via IA) não depende do hook: roda em paralelo às chamadas
+    # de IA do hook e só é aguardado na checagem de consistência hook x corpo.
+    with ThreadPoolExecutor(max_workers=1) as body_pool:
+        body_future = body_pool.submit(_prepare_overlay_body, body, item)
 
-    if _is_probably_bad_hook(hook_clean):
-        hook_clean = _build_v5_fallback_hook(item)
-    hook_clean = _smart_truncate_hook(hook_clean, max_words=10)
-    hook_clean = _fit_hook_to_overlay(hook_clean, max_chars=HOOK_WRAP_WIDTH, max_lines=HOOK_MAX_LINES, min_words=5)
-    if _is_overgeneric_hook(hook_clean):
-        ai_retry = _generate_contextual_hook_with_ai(item, recent_hooks, fallback=hook_clean)
-        if ai_retry:
-            hook_clean = ai_retry
-    if _is_probably_bad_hook(hook_clean):
-        hook_clean = _build_v5_fallback_hook(item)
-    hook_clean = _trim_trailing_connectors(hook_clean)
-    hook_clean = _smart_truncate_hook(hook_clean, max_words=10)
-    hook_clean = _fit_hook_to_overlay(hook_clean, max_chars=HOOK_WRAP_WIDTH, max_lines=HOOK_MAX_LINES, min_words=5)
+        ai_hook = _generate_contextual_hook_with_ai(item, recent_hooks, fallback=hook_clean)
+        if ai_hook:
+            hook_clean = ai_hook
 
-    headline_text_clean = re.sub(r"#\w+", "", headline_core).strip()
-    headline_text_clean = re.sub(r"[^\w\s\u00C0-\u00FF.,;:?!-]", "", headline_text_clean)
-    headline_text_clean = re.sub(r"\s+", " ", headline_text_clean).strip()
-    headline = _enforce_editorial_headline(headline_text_clean, item.title)
-    headline = _ensure_contextual_headline_line(headline, item)
+        if _is_probably_bad_hook(hook_clean):
+            hook_clean = _build_v5_fallback_hook(item)
+        hook_clean = _smart_truncate_hook(hook_clean, max_words=10)
+        hook_clean = _fit_hook_to_overlay(hook_clean, max_chars=HOOK_WRAP_WIDTH, max_lines=HOOK_MAX_LINES, min_words=5)
+        if _is_overgeneric_hook(hook_clean):
+            ai_retry = _generate_contextual_hook_with_ai(item, recent_hooks, fallback=hook_clean)
+            if ai_retry:
+                hook_clean = ai_retry
+        if _is_probably_bad_hook(hook_clean):
+            hook_clean = _build_v5_fallback_hook(item)
+        hook_clean = _trim_trailing_connectors(hook_clean)
+        hook_clean = _smart_truncate_hook(hook_clean, max_words=10)
+        hook_clean = _fit_hook_to_overlay(hook_clean, max_chars=HOOK_WRAP_WIDTH, max_lines=HOOK_MAX_LINES, min_words=5)
 
-    body_text_clean = re.sub(r"#\w+", "", body).strip()
-    body_text_clean = re.sub(r"[^\w\s\u00C0-\u00FF.,;:?!-]", "", body_text_clean)
-    body_text_clean = re.sub(r"\s+", " ", body_text_clean).strip()
-    body_text_clean = _ensure_contextual_body_line(body_text_clean, item)
-    body_text_clean = _rewrite_overlay_body_if_needed(body_text_clean, item=item)
-    body_text_clean = _build_tarja_text(body_text_clean, item=item)
-    if _looks_incomplete_pt_line(body_text_clean):
-        body_text_clean = _build_tarja_text(_build_v5_fallback_body(item), item=item)
+        headline_text_clean = re.sub(r"#\w+", "", headline_core).strip()
+        headline_text_clean = re.sub(r"[^\w\s\u00C0-\u00FF.,;:?!-]", "", headline_text_clean)
+        headline_text_clean = re.sub(r"\s+", " ", headline_text_clean).strip()
+        headline = _enforce_editorial_headline(headline_text_clean, item.title)
+        headline = _ensure_contextual_headline_line(headline, item)
+
+        body_text_clean = body_future.result()
     if _is_hook_inconsistent_with_story(hook_clean, headline, body_text_clean):
         hook_clean = _build_v5_fallback_hook(item)
         hook_clean = _smart_truncate_hook(hook_clean, max_words=10)
@@ -2857,7 +2954,7 @@ def build_editorial_pack_for_item(
         )
     layout_plan = _plan_overlay_layout(hook_clean, body_text_clean)
 
-    if hook_history_path is not None:
+    if hook_history_path is not None and save_hook_history:
         _save_hook_to_history(hook_history_path, hook_clean, title=item.title, source=item.source)
 
     return {
@@ -2875,18 +2972,46 @@ def build_editorial_pack_for_item(
     }
 
 
+LOGO_FILENAMES = ("logo.png", "logo.webp", "logo.jpg", "logo.jpeg")
+
+
+@lru_cache(maxsize=8)
+def _resolve_logo_path(logo_arg: str, post_dir: Path) -> Path | None:
+    """Logo explícito (--logo) ou o primeiro logo.* em post_dir, com fallback em assets/Logo.
+
+    Resolvido uma vez por processo: o scheduler/--count N não repetem os stats a cada post.
+    """
+    if logo_arg:
+        return Path(logo_arg).expanduser().resolve()
+    for name in LOGO_FILENAMES:
+        candidate = post_dir / name
+        if candidate.exists():
+            return candidate
+    candidate = ROOT_DIR / "assets" / "Logo" / "logo.png"
+    return candidate if candidate.exists() else None
+
+
 def create_post_for_item(item: NewsItem, args: argparse.Namespace) -> bool:
     """Função centralizada para criar um post a partir de um NewsItem."""
-    root = Path(__file__).resolve().parents[1]
+    root = ROOT_DIR
     post_dir = root / "gossip_post"
     post_dir.mkdir(parents=True, exist_ok=True)
     hook_history_path = post_dir / HOOK_HISTORY_FILE
 
     try:
-        image_path = _download_image(item.image_url, post_dir / "news_image")
+        # Download da imagem roda em paralelo com o pack editorial (chamadas de IA, segundos).
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            image_future = pool.submit(_download_image, item.image_url, post_dir / "news_image")
+            editorial_pack = build_editorial_pack_for_item(
+                item,
+                hook_history_path=hook_history_path,
+                save_hook_history=False,
+            )
+            image_path = image_future.result()
+        # Só registra o hook depois que a imagem baixou: falha no download não "gasta" o hook.
+        _save_hook_to_history(hook_history_path, editorial_pack["hook"], title=item.title, source=item.source)
         # Padrao VN: sem moldura decorativa, mantendo look limpo preto + logo + texto.
         render_image_path = image_path
-        editorial_pack = build_editorial_pack_for_item(item, hook_history_path=hook_history_path)
         hook_clean = editorial_pack["hook"]
         headline = editorial_pack["headline"]
         body_text_clean = editorial_pack["body"]
@@ -2926,7 +3051,7 @@ def create_post_for_item(item: NewsItem, args: argparse.Namespace) -> bool:
             "image_url": item.image_url,
             "description": item.description,
             "local_image": str(image_path.relative_to(root)),
-            "render_image": str(render_image_path.relative_to(root)) if render_image_path.exists() else str(image_path.relative_to(root)),
+            "render_image": str(render_image_path.relative_to(root)),
             "video_duration_s": image_duration_s,
             "hook": hook_clean,
             "headline": headline,
@@ -2946,19 +3071,7 @@ def create_post_for_item(item: NewsItem, args: argparse.Namespace) -> bool:
         slug = _make_slug(item.title)
         output_video = post_dir / "output" / f"gossip_{slug}.mp4"
 
-        logo_path = None
-        if args.logo:
-            logo_path = Path(args.logo).expanduser().resolve()
-        else:
-            for name in ("logo.png", "logo.webp", "logo.jpg", "logo.jpeg"):
-                candidate = post_dir / name
-                if candidate.exists():
-                    logo_path = candidate
-                    break
-            if logo_path is None:
-                candidate = root / "assets" / "Logo" / "logo.png"
-                if candidate.exists():
-                    logo_path = candidate
+        logo_path = _resolve_logo_path(args.logo or "", post_dir)
 
         _render_short(
             render_image_path,
@@ -2992,10 +3105,6 @@ def create_post_for_item(item: NewsItem, args: argparse.Namespace) -> bool:
         artifact_json = output_video.with_suffix(".json")
         artifact_json.write_text(json.dumps(artifact_payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
 
-        # Adiciona um pequeno delay para garantir que o arquivo de vídeo seja liberado pelo SO
-        import time
-        time.sleep(1)
-
         # Telegram Notification with hashtags in caption
         # Clean up hook and headline for better formatting (já estão limpos, sem hashtags)
         hook_telegram = " ".join(hook_clean.split())  # Remove extra spaces/newlines
@@ -20,7 +20,7 @@ from pathlib import Path
 
 # Adiciona o diretório scripts ao path
 sys.path.insert(0, str(Path(__file__).parent))
-from create_gossip_post import _render_short_video, _send_video_to_telegram, _get_random_cta, _build_tarja_text
+from create_gossip_post import ROOT_DIR, _render_short_video, _resolve_logo_path, _send_video_to_telegram, _get_random_cta, _build_tarja_text
 
 
 def _build_video_download_candidates(url: str) -> list[str]:
@@ -99,7 +99,13 @@ def _download_video_with_fallback(video_url: str, output_path: Path) -> None:
             print("⚠️ API padrão do X falhou; tentando modo syndication...")
             result = _run_download(candidate, extractor_api="syndication")
 
-        if result.returncode == 0 and output_path.exists() and output_path.stat().st_size > 100 * 1024:
+        # Um único stat por tentativa (em vez de exists() + stat() repetidos).
+        try:
+            downloaded_size = output_path.stat().st_size
+        except FileNotFoundError:
+            downloaded_size = -1
+
+        if result.returncode == 0 and downloaded_size > 100 * 1024:
             return
 
         stderr = (result.stderr or "").strip()
@@ -107,7 +113,7 @@ def _download_video_with_fallback(video_url: str, output_path: Path) -> None:
         combined = stderr or stdout or f"yt-dlp retornou código {result.returncode}"
         last_error = combined[-1200:]
 
-        if output_path.exists() and output_path.stat().st_size <= 100 * 1024:
+        if 0 <= downloaded_size <= 100 * 1024:
             try:
                 output_path.unlink()
             except OSError:
@@ -306,7 +312,7 @@ Exemplos:
                 return 1
     
     # Caminhos
-    root = Path(__file__).resolve().parents[1]
+    root = ROOT_DIR
     post_dir = root / "gossip_post"
     post_dir.mkdir(exist_ok=True)
     
@@ -335,16 +341,7 @@ Exemplos:
     body_file.write_text(args.body, encoding="utf-8")
     
     # Logo (se existir)
-    logo_path = None
-    for name in ("logo.png", "logo.webp", "logo.jpg", "logo.jpeg"):
-        candidate = post_dir / name
-        if candidate.exists():
-            logo_path = candidate
-            break
-    if logo_path is None:
-        candidate = root / "assets" / "Logo" / "logo.png"
-        if candidate.exists():
-            logo_path = candidate
+    logo_path = _resolve_logo_path("", post_dir)
     
     # Renderizar
     print("\n🎬 Renderizando post com overlay de texto...")
@@ -12,14 +12,15 @@ Fluxo:
 from __future__ import annotations
 
 import argparse
+import heapq
 import json
 import os
 import random
-import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from fractions import Fraction
 from pathlib import Path
 
-import requests
 from dotenv import load_dotenv
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
@@ -39,9 +40,11 @@ IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp"}
 FPS = 30000 / 1001
 OUTPUT_WIDTH = 1080
 OUTPUT_HEIGHT = 1920
+MAX_IMAGES = 3
+SHARED_INPUT_MAX_SPAN_RATIO = 2.0
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Segment:
     kind: str  # "video" | "image"
     source: Path
@@ -49,33 +52,58 @@ class Segment:
     start: float = 0.0
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ImageInfo:
     path: Path
     width: int
     height: int
 
 
-def _video_duration_s(ffprobe_path: str, file_path: Path) -> float:
+def _stream_fps(stream: dict) -> float:
+    for key in ("avg_frame_rate", "r_frame_rate"):
+        try:
+            fps = float(Fraction(str(stream.get(key) or "0")))
+        except (ValueError, ZeroDivisionError):
+            continue
+        if fps > 0:
+            return fps
+    return 0.0
+
+
+def _probe_video(ffprobe_path: str, file_path: Path) -> tuple[float, float]:
+    """(duração em s, fps do primeiro stream de vídeo; 0.0 quando desconhecido)."""
     probe = ffprobe_json(ffprobe_path, str(file_path))
     duration = ((probe.get("format") or {}).get("duration")) or "0"
     try:
-        return max(0.0, float(duration))
+        duration_s = max(0.0, float(duration))
     except Exception:
-        return 0.0
+        duration_s = 0.0
+    fps = 0.0
+    for stream in probe.get("streams") or []:
+        if stream.get("codec_type") == "video":
+            fps = _stream_fps(stream)
+            break
+    return duration_s, fps
 
 
-def _pick_primary_video(ffprobe_path: str, videos: list[Path]) -> tuple[Path, float]:
+def _probe_workers(n: int) -> int:
+    return max(1, min(n, 16, (os.cpu_count() or 4) * 2))
+
+
+def _pick_primary_video(ffprobe_path: str, videos: list[Path]) -> tuple[Path, float, float]:
     best_path: Path | None = None
     best_duration = -1.0
-    for path in videos:
-        duration = _video_duration_s(ffprobe_path, path)
+    best_fps = 0.0
+    with ThreadPoolExecutor(max_workers=_probe_workers(len(videos))) as pool:
+        probes = list(pool.map(lambda p: _probe_video(ffprobe_path, p), videos))
+    for path, (duration, fps) in zip(videos, probes):
         if duration > best_duration:
             best_duration = duration
+            best_fps = fps
             best_path = path
     if best_path is None:
         raise RuntimeError("Nenhum vídeo válido encontrado em raw/video.")
-    return best_path, best_duration
+    return best_path, best_duration, best_fps
 
 
 def _read_image_info(ffprobe_path: str, image_path: Path) -> ImageInfo | None:
@@ -94,21 +122,40 @@ def _read_image_info(ffprobe_path: str, image_path: Path) -> ImageInfo | None:
         return None
 
 
+def _probe_images(ffprobe_path: str, paths: list[Path]) -> list[ImageInfo | None]:
+    # ffprobe é um processo por arquivo: em paralelo o custo de spawn se sobrepõe.
+    if len(paths) <= 1:
+        return [_read_image_info(ffprobe_path, p) for p in paths]
+    with ThreadPoolExecutor(max_workers=_probe_workers(len(paths))) as pool:
+        return list(pool.map(lambda p: _read_image_info(ffprobe_path, p), paths))
+
+
+def _scan_media_dir(directory: Path, exts: set[str], *, min_bytes: int) -> list[Path]:
+    # os.scandir traz o tipo do arquivo junto da listagem; só precisamos de um stat para o tamanho.
+    # A própria listagem faz o papel do exists(): pasta ausente vira o erro de sempre.
+    found: list[Path] = []
+    try:
+        it = os.scandir(directory)
+    except FileNotFoundError:
+        raise RuntimeError(f"Pasta não encontrada: {directory}") from None
+    with it:
+        for entry in it:
+            if os.path.splitext(entry.name)[1].lower() not in exts:
+                continue
+            if not entry.is_file() or entry.stat().st_size <= min_bytes:
+                continue
+            found.append(Path(entry.path))
+    found.sort()
+    return found
+
+
 def _collect_media(post_dir: Path, *, ffprobe_path: str) -> tuple[list[Path], list[Path]]:
     raw_video_dir = post_dir / "raw" / "video"
     raw_image_dir = post_dir / "raw" / "images"
-    if not raw_video_dir.exists():
-        raise RuntimeError(f"Pasta não encontrada: {raw_video_dir}")
-    if not raw_image_dir.exists():
-        raise RuntimeError(f"Pasta não encontrada: {raw_image_dir}")
 
-    videos = sorted(
-        p for p in raw_video_dir.iterdir() if p.is_file() and p.suffix.lower() in VIDEO_EXTS and p.stat().st_size > 250 * 1024
-    )
-    raw_images = sorted(
-        p for p in raw_image_dir.iterdir() if p.is_file() and p.suffix.lower() in IMAGE_EXTS and p.stat().st_size > 20 * 1024
-    )
-    image_infos = [info for info in (_read_image_info(ffprobe_path, p) for p in raw_images) if info]
+    videos = _scan_media_dir(raw_video_dir, VIDEO_EXTS, min_bytes=250 * 1024)
+    raw_images = _scan_media_dir(raw_image_dir, IMAGE_EXTS, min_bytes=20 * 1024)
+    image_infos = [info for info in _probe_images(ffprobe_path, raw_images) if info]
 
     # Evita imagens muito pequenas/baixa qualidade que tendem a ficar ruins no frame vertical.
     qualified = [
@@ -117,7 +164,8 @@ def _collect_media(post_dir: Path, *, ffprobe_path: str) -> tuple[list[Path], li
         if (info.width * info.height) >= 700_000 and info.width >= 900 and info.height >= 500
     ]
     pool = qualified if len(qualified) >= 2 else image_infos
-    pool = sorted(pool, key=lambda i: (i.width * i.height), reverse=True)
+    # Só as MAX_IMAGES maiores entram na timeline: top-k em vez de ordenar tudo.
+    pool = heapq.nlargest(MAX_IMAGES, pool, key=lambda i: (i.width * i.height))
     images = [info.path for info in pool]
     return videos, images
 
@@ -132,7 +180,7 @@ def _build_segments(
     if duration_s <= 0:
         raise RuntimeError("Duração do post deve ser maior que zero.")
 
-    max_images = min(3, len(images))
+    max_images = min(MAX_IMAGES, len(images))
     if max_images <= 0:
         return [Segment(kind="video", source=video_path, duration=duration_s, start=0.0)]
 
@@ -183,52 +231,38 @@ def _build_segments(
     return segs
 
 
-def _render_video_segment(ffmpeg_path: str, segment: Segment, output_path: Path) -> None:
-    vf = (
+def _video_segment_filter(
+    in_label: str,
+    index: int,
+    segment: Segment,
+    *,
+    source_fps: float = 0.0,
+    trim_start: float = 0.0,
+) -> str:
+    # Fonte já em 29.97 (caso comum): o filtro fps só duplicaria/descartaria nada, frame a frame.
+    fps_filter = "" if abs(source_fps - FPS) < 0.01 else "fps=30000/1001,"
+    return (
+        f"{in_label}trim=start={trim_start:.3f}:duration={segment.duration:.3f},setpts=PTS-STARTPTS,"
         f"scale={OUTPUT_WIDTH}:{OUTPUT_HEIGHT}:force_original_aspect_ratio=increase,"
-        f"crop={OUTPUT_WIDTH}:{OUTPUT_HEIGHT},setsar=1,format=yuv420p"
+        f"crop={OUTPUT_WIDTH}:{OUTPUT_HEIGHT},setsar=1,{fps_filter}format=yuv420p[v{index}]"
     )
-    args = [
-        "-y",
-        "-ss",
-        f"{segment.start:.3f}",
-        "-i",
-        str(segment.source),
-        "-t",
-        f"{segment.duration:.3f}",
-        "-an",
-        "-vf",
-        vf,
-        "-r",
-        "30000/1001",
-        "-c:v",
-        "libx264",
-        "-preset",
-        "veryfast",
-        "-crf",
-        "18",
-        "-pix_fmt",
-        "yuv420p",
-        str(output_path),
-    ]
-    run_ffmpeg(ffmpeg_path, args, stream_output=False)
 
 
-def _render_image_segment(ffmpeg_path: str, segment: Segment, output_path: Path, *, zoom_amount: float) -> None:
+def _image_segment_filter(input_index: int, index: int, segment: Segment, *, zoom_amount: float) -> str:
     # Preserva proporção da foto no foreground e usa fundo blur para preencher o 9:16.
     frame_count = max(2, int(round(segment.duration * FPS)))
     denom = max(1, frame_count - 1)
     internal_w = OUTPUT_WIDTH * 2
     internal_h = OUTPUT_HEIGHT * 2
     zoom_expr = f"1+{zoom_amount:.6f}*n/{denom}"
-    fc = (
-        "[0:v]split=2[bgin][fgin];"
-        "[bgin]scale="
+    return (
+        f"[{input_index}:v]split=2[bgin{index}][fgin{index}];"
+        f"[bgin{index}]scale="
         f"{OUTPUT_WIDTH}:{OUTPUT_HEIGHT}:force_original_aspect_ratio=increase,"
-        f"crop={OUTPUT_WIDTH}:{OUTPUT_HEIGHT},boxblur=28:12[bg];"
-        "[fgin]scale="
-        f"{OUTPUT_WIDTH}:{OUTPUT_HEIGHT}:force_original_aspect_ratio=decrease[fg];"
-        "[bg][fg]overlay=(W-w)/2:(H-h)/2,"
+        f"crop={OUTPUT_WIDTH}:{OUTPUT_HEIGHT},boxblur=28:12[bg{index}];"
+        f"[fgin{index}]scale="
+        f"{OUTPUT_WIDTH}:{OUTPUT_HEIGHT}:force_original_aspect_ratio=decrease[fg{index}];"
+        f"[bg{index}][fg{index}]overlay=(W-w)/2:(H-h)/2,"
         f"scale={internal_w}:{internal_h}:flags=lanczos,"
         "scale="
         f"w='trunc({internal_w}*({zoom_expr})/2)*2':"
@@ -236,25 +270,91 @@ def _render_image_segment(ffmpeg_path: str, segment: Segment, output_path: Path,
         "eval=frame,"
         f"crop={internal_w}:{internal_h}:(in_w-{internal_w})/2:(in_h-{internal_h})/2,"
         f"scale={OUTPUT_WIDTH}:{OUTPUT_HEIGHT}:flags=lanczos,"
-        "setsar=1,format=yuv420p[vout]"
+        f"setsar=1,format=yuv420p,trim=end_frame={frame_count},setpts=PTS-STARTPTS[v{index}]"
     )
+
+
+def _shared_input_groups(segments: list[Segment]) -> list[list[int]]:
+    """Índices de trechos de vídeo que podem compartilhar uma entrada (um demux/decode + split/trim).
+
+    Só agrupa quando a janela que cobre os trechos não é muito maior que o tempo usado e os
+    inícios crescem na ordem da timeline: o concat consome os ramos do split em sequência, e um
+    trecho que volta no tempo faria o split enfileirar em memória todos os frames dele.
+    """
+    video_groups: dict[Path, list[int]] = {}
+    for idx, seg in enumerate(segments):
+        if seg.kind == "video":
+            video_groups.setdefault(seg.source, []).append(idx)
+    groups: list[list[int]] = []
+    for idxs in video_groups.values():
+        if len(idxs) < 2:
+            continue
+        starts = [segments[i].start for i in idxs]
+        if any(b <= a for a, b in zip(starts, starts[1:])):
+            continue
+        span_start = starts[0]
+        span_end = max(segments[i].start + segments[i].duration for i in idxs)
+        used = sum(segments[i].duration for i in idxs)
+        if (span_end - span_start) > SHARED_INPUT_MAX_SPAN_RATIO * used:
+            continue
+        groups.append(idxs)
+    return groups
+
+
+def _render_timeline(
+    ffmpeg_path: str,
+    segments: list[Segment],
+    output_path: Path,
+    *,
+    zoom_amounts: list[float],
+    video_fps: float = 0.0,
+) -> None:
+    # Um único processo/encode: os trechos são normalizados no filtergraph e juntados
+    # com concat (sem arquivos intermediários).
+    input_args: list[str] = []
+    chains: list[str] = []
+    input_count = 0
+
+    # Trechos do mesmo vídeo compartilham uma entrada quando possível; senão, um seek por trecho.
+    shared: dict[int, tuple[str, float]] = {}
+    for idxs in _shared_input_groups(segments):
+        source = segments[idxs[0]].source
+        span_start = segments[idxs[0]].start
+        span_end = max(segments[i].start + segments[i].duration for i in idxs)
+        input_args += ["-ss", f"{span_start:.3f}", "-t", f"{span_end - span_start:.3f}", "-i", str(source)]
+        labels = [f"[src{input_count}_{k}]" for k in range(len(idxs))]
+        chains.append(f"[{input_count}:v]split={len(idxs)}{''.join(labels)}")
+        for i, label in zip(idxs, labels):
+            shared[i] = (label, segments[i].start - span_start)
+        input_count += 1
+
+    image_idx = 0
+    for idx, seg in enumerate(segments):
+        if seg.kind == "video":
+            if idx in shared:
+                label, trim_start = shared[idx]
+            else:
+                input_args += ["-ss", f"{seg.start:.3f}", "-t", f"{seg.duration:.3f}", "-i", str(seg.source)]
+                label, trim_start = f"[{input_count}:v]", 0.0
+                input_count += 1
+            chains.append(_video_segment_filter(label, idx, seg, source_fps=video_fps, trim_start=trim_start))
+        else:
+            input_args += ["-loop", "1", "-framerate", "30000/1001", "-t", f"{seg.duration:.3f}", "-i", str(seg.source)]
+            chains.append(_image_segment_filter(input_count, idx, seg, zoom_amount=zoom_amounts[image_idx]))
+            input_count += 1
+            image_idx += 1
+
+    concat_inputs = "".join(f"[v{idx}]" for idx in range(len(segments)))
+    chains.append(f"{concat_inputs}concat=n={len(segments)}:v=1:a=0[vout]")
+
     args = [
         "-y",
-        "-loop",
-        "1",
-        "-framerate",
-        "30000/1001",
-        "-t",
-        f"{segment.duration:.3f}",
-        "-i",
-        str(segment.source),
-        "-an",
+        *input_args,
         "-filter_complex",
-        fc,
+        ";".join(chains),
         "-map",
         "[vout]",
-        "-frames:v",
-        str(frame_count),
+        "-an",
         "-r",
         "30000/1001",
         "-c:v",
@@ -265,42 +365,16 @@ def _render_image_segment(ffmpeg_path: str, segment: Segment, output_path: Path,
         "18",
         "-pix_fmt",
         "yuv420p",
+        "-movflags",
+        "+faststart",
         str(output_path),
     ]
     run_ffmpeg(ffmpeg_path, args, stream_output=False)
 
 
-def _concat_segments(ffmpeg_path: str, segment_files: list[Path], output_path: Path) -> None:
-    with tempfile.TemporaryDirectory(prefix="raw_post_concat_") as tmp_dir:
-        list_path = Path(tmp_dir) / "concat.txt"
-        lines = [f"file '{p.resolve()}'" for p in segment_files]
-        list_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
-
-        args = [
-            "-y",
-            "-f",
-            "concat",
-            "-safe",
-            "0",
-            "-i",
-            str(list_path),
-            "-an",
-            "-c:v",
-            "libx264",
-            "-preset",
-            "veryfast",
-            "-crf",
-            "18",
-            "-pix_fmt",
-            "yuv420p",
-            "-movflags",
-            "+faststart",
-            str(output_path),
-        ]
-        run_ffmpeg(ffmpeg_path, args, stream_output=False)
-
-
 def _send_video_to_telegram(video_path: Path, caption: str) -> bool:
+    import requests
+
     bot_token = os.getenv("TELEGRAM_BOT_TOKEN", "").strip()
     chat_id = os.getenv("TELEGRAM_CHAT_ID", "").strip()
     if not bot_token or not chat_id:
@@ -366,21 +440,22 @@ def _parse_args() -> argparse.Namespace:
 
 def main() -> int:
     args = _parse_args()
-    random.seed(args.seed)
-
-    post_dir = Path(args.post_dir).expanduser().resolve()
-    if not post_dir.exists():
-        raise RuntimeError(f"Pasta não encontrada: {post_dir}")
 
+    # abspath é puramente léxico (resolve() faz lstat em cada componente); o mkdir de output/
+    # sem parents já acusa a pasta do post ausente, dispensando o exists().
+    post_dir = Path(os.path.abspath(os.path.expanduser(args.post_dir)))
     output_dir = post_dir / "output"
-    output_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        output_dir.mkdir(exist_ok=True)
+    except FileNotFoundError:
+        raise RuntimeError(f"Pasta não encontrada: {post_dir}") from None
 
     ff = ensure_ffmpeg("tools")
     videos, images = _collect_media(post_dir, ffprobe_path=ff.ffprobe)
     if not videos:
         raise RuntimeError("Nenhum vídeo encontrado em raw/video para montar o post raw.")
 
-    primary_video, primary_duration = _pick_primary_video(ff.ffprobe, videos)
+    primary_video, primary_duration, primary_fps = _pick_primary_video(ff.ffprobe, videos)
     segments = _build_segments(
         duration_s=args.duration,
         video_path=primary_video,
@@ -391,33 +466,25 @@ def main() -> int:
         raise RuntimeError("Falha ao construir timeline de segmentos.")
 
     print(f"🎞️ Vídeo base: {primary_video.name} ({primary_duration:.2f}s)")
-    print(f"🖼️ Imagens usadas: {min(3, len(images))}")
+    print(f"🖼️ Imagens usadas: {min(MAX_IMAGES, len(images))}")
     if images:
         print("🖼️ Seleção de imagens:")
-        for img in images[:3]:
+        for img in images[:MAX_IMAGES]:
             print(f"   - {img.name}")
     print(f"🧩 Segmentos totais: {len(segments)}")
 
-    temp_files: list[Path] = []
-    with tempfile.TemporaryDirectory(prefix="raw_post_segments_") as tmp_dir:
-        tmp_path = Path(tmp_dir)
-        for idx, seg in enumerate(segments):
-            seg_file = tmp_path / f"seg_{idx:02d}.mp4"
-            temp_files.append(seg_file)
-            if seg.kind == "video":
-                _render_video_segment(ff.ffmpeg, seg, seg_file)
-            else:
-                # Zoom total discreto para evitar sensação de "tremido".
-                zoom_amount = random.uniform(0.018, 0.030)
-                _render_image_segment(ff.ffmpeg, seg, seg_file, zoom_amount=zoom_amount)
+    # Zoom total discreto para evitar sensação de "tremido". Sorteado de uma vez, com RNG local
+    # (mesma sequência que random.seed(args.seed) produzia, sem mexer no random global).
+    rng = random.Random(args.seed)
+    zoom_amounts = [rng.uniform(0.018, 0.030) for seg in segments if seg.kind == "image"]
 
-        output_video = output_dir / f"{args.name}.mp4"
-        _concat_segments(ff.ffmpeg, temp_files, output_video)
+    output_video = output_dir / f"{args.name}.mp4"
+    _render_timeline(ff.ffmpeg, segments, output_video, zoom_amounts=zoom_amounts, video_fps=primary_fps)
 
     manifest = {
         "name": args.name,
         "post_dir": str(post_dir),
-        "output_video": str((output_dir / f"{args.name}.mp4")),
+        "output_video": str(output_video),
         "duration_target_s": args.duration,
         "primary_video": str(primary_video),
         "primary_video_duration_s": round(primary_duration, 3),
@@ -437,12 +504,12 @@ def main() -> int:
     manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
 
     print("=" * 72)
-    print(f"✅ Post RAW gerado: {output_dir / f'{args.name}.mp4'}")
+    print(f"✅ Post RAW gerado: {output_video}")
     print(f"🧾 Manifesto: {manifest_path}")
     print("=" * 72)
 
     if args.send_telegram:
-        _send_video_to_telegram(output_dir / f"{args.name}.mp4", args.caption)
+        _send_video_to_telegram(output_video, args.caption)
 
     return 0
 
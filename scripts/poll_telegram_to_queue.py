@@ -23,20 +23,32 @@ def send_message(chat_id: str, text: str) -> bool:
         return False
 
 
-def find_existing_request(chat_id: str, video_url: str) -> str | None:
-    for req_file in sorted(QUEUE_DIR.glob("request_*.json"), reverse=True):
+def load_active_requests() -> dict[tuple[str, str], str]:
+    """Indexa (chat_id, video_url) -> id das requisições pending/processing (lido uma vez por poll)."""
+    index: dict[tuple[str, str], str] = {}
+    # scandir: uma leitura do diretório, tipo do arquivo vem do DirEntry (sem stat por arquivo).
+    with os.scandir(QUEUE_DIR) as it:
+        names = [
+            entry.name
+            for entry in it
+            if entry.name.startswith("request_") and entry.name.endswith(".json") and entry.is_file()
+        ]
+    names.sort(reverse=True)
+    for name in names:
         try:
-            req = json.loads(req_file.read_text(encoding="utf-8"))
+            with open(QUEUE_DIR / name, "rb") as f:
+                req = json.load(f)
         except Exception:
             continue
 
-        if (
-            str(req.get("chat_id", "")) == chat_id
-            and str(req.get("video_url", "")).strip() == video_url
-            and str(req.get("status", "")).strip() in {"pending", "processing"}
-        ):
-            return str(req.get("id", "")).strip() or None
-    return None
+        if str(req.get("status", "")).strip() not in {"pending", "processing"}:
+            continue
+        request_id = str(req.get("id", "")).strip()
+        if not request_id:
+            continue
+        # Ordem reversa: a requisição mais recente para o mesmo link prevalece.
+        index.setdefault((str(req.get("chat_id", "")), str(req.get("video_url", "")).strip()), request_id)
+    return index
 
 def get_last_id():
     if ID_FILE.exists():
@@ -70,6 +82,7 @@ def poll():
         print(f"📩 {len(updates)} novas atualizações encontradas")
         
         new_requests = 0
+        active_requests = load_active_requests()
         for update in updates:
             update_id = update["update_id"]
             save_last_id(update_id)
@@ -95,7 +108,7 @@ def poll():
                     if "?" in video_url:
                         video_url = video_url.split("?")[0]
 
-                    existing_id = find_existing_request(chat_id, video_url)
+                    existing_id = active_requests.get((chat_id, video_url))
                     if existing_id:
                         send_message(
                             chat_id,
@@ -122,6 +135,7 @@ def poll():
                     with open(QUEUE_DIR / f"request_{request_id}.json", "w") as f:
                         json.dump(req, f, indent=2)
                     
+                    active_requests[(chat_id, video_url)] = request_id
                     print(f"✅ Requisição {request_id} salva!")
                     send_message(
                         chat_id,
@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
+import codecs
+import heapq
+import re
 import time
-import json
 import subprocess
 import sys
+import threading
 import argparse
 import requests
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from email.utils import parsedate_to_datetime
 from pathlib import Path
@@ -15,6 +19,9 @@ ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
+from core import json_utils
+from core.file_utils import write_text_atomic
+
 # Importa as configurações e funções do script original
 try:
     from scripts.create_gossip_post import (
@@ -25,13 +32,23 @@ try:
         _clean_text, 
         _strip_html, 
         _image_from_item,
-        _extract_article_text,
+        _article_text_from_html,
+        _get_http_session,
     )
 except ImportError:
     print("❌ Erro: Não foi possível importar scripts.create_gossip_post. Certifique-se de que o caminho está correto.")
     sys.exit(1)
 
 HISTORY_FILE = ROOT_DIR / "gossip_post" / "history.json"
+FEED_FETCH_WORKERS = 6
+# Artigos sem imagem não mudam de uma rodada para outra: evita rebaixá-los a cada horário.
+ARTICLE_MISS_TTL_S = 6 * 3600
+_article_image_misses: dict[str, float] = {}
+_article_image_misses_lock = threading.Lock()
+# Validadores HTTP por feed: feed sem novidade responde 304 e o corpo anterior é reaproveitado.
+# url -> (etag, last_modified, content, content_type, encoding)
+_feed_cache: dict[str, tuple[str, str, bytes, str, str]] = {}
+_feed_cache_lock = threading.Lock()
 HOT_KEYWORDS = {
     "bbb": 3.0,
     "paredao": 2.5,
@@ -47,22 +64,23 @@ HOT_KEYWORDS = {
     "gravidez": 1.6,
     "carnaval": 1.4,
 }
+# Um único scan do título. O lookahead acha ocorrências sobrepostas (ex.: "flagravidez"),
+# então o conjunto de chaves encontradas é o mesmo do antigo `key in title` por chave.
+_HOT_KEYWORDS_RE = re.compile("(?=(" + "|".join(re.escape(k) for k in HOT_KEYWORDS) + "))")
 
 def load_history():
     """Carrega a lista de links já processados."""
     if HISTORY_FILE.exists():
         try:
-            with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-                content = json.load(f)
-                return content if isinstance(content, list) else []
+            content = json_utils.loads(HISTORY_FILE.read_bytes())
+            return content if isinstance(content, list) else []
         except Exception:
             return []
     return []
 
 def save_history(history):
     """Salva a lista de links processados, mantendo apenas os últimos 50."""
-    with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(history[-50:], f, ensure_ascii=False, indent=2)
+    write_text_atomic(HISTORY_FILE, json_utils.dumps(history[-50:], indent=2))
 
 
 def _parse_published(raw: str) -> datetime | None:
@@ -85,9 +103,11 @@ def _score_item(item: NewsItem) -> float:
     description = _clean_text(item.description).lower()
     score = 0.0
 
-    for key, weight in HOT_KEYWORDS.items():
-        if key in title:
-            score += weight
+    found = set(_HOT_KEYWORDS_RE.findall(title))
+    if found:
+        for key, weight in HOT_KEYWORDS.items():
+            if key in found:
+                score += weight
 
     words = title.split()
     if 7 <= len(words) <= 18:
@@ -115,116 +135,136 @@ def _score_item(item: NewsItem) -> float:
 
     return score
 
-def fetch_all_upcoming_news(profile="br"):
-    """Busca todas as notícias disponíveis nos feeds do perfil.
+def _recent_image_miss(link: str) -> bool:
+    with _article_image_misses_lock:
+        ts = _article_image_misses.get(link)
+        if ts is None:
+            return False
+        if time.monotonic() - ts > ARTICLE_MISS_TTL_S:
+            del _article_image_misses[link]
+            return False
+        return True
 
-    Importante: para evitar 'corpo' truncado/incompleto no pipeline do scheduler,
-    prioriza a extração do texto do artigo (quando possível) em vez do excerpt do feed.
+
+def _remember_image_miss(link: str) -> None:
+    with _article_image_misses_lock:
+        _article_image_misses[link] = time.monotonic()
+
+
+def _fetch_article_html(session: requests.Session, link: str, headers: dict[str, str]) -> str:
+    """HTML da página do artigo ("" em erro/status != 200)."""
+    try:
+        resp = session.get(link, headers=headers, timeout=20)
+    except Exception:
+        return ""
+    return resp.text if resp.status_code == 200 else ""
+
+
+# Padrões simplificados para extração rápida no scheduler (compilados uma vez; rodam em todo artigo).
+_ARTICLE_IMAGE_PATTERNS = (
+    re.compile(r"<meta[^>]+property=[\"']og:image[\"'][^>]+content=[\"']([^\"']+)", re.IGNORECASE),
+    re.compile(r"<img[^>]+src=[\"']([^\"']+)", re.IGNORECASE),
+)
+
+
+def _article_image_from_html(html: str) -> str:
+    for pattern in _ARTICLE_IMAGE_PATTERNS:
+        match = pattern.search(html)
+        if match:
+            url = match.group(1).strip()
+            if url.startswith("http"):
+                return url
+    return ""
+
+
+def _fetch_feed_body(session: requests.Session, feed_url: str, headers: dict[str, str]) -> tuple[bytes, str, str] | None:
+    """(content, content-type, encoding) do feed via GET condicional; None em erro/status inesperado."""
+    with _feed_cache_lock:
+        cached = _feed_cache.get(feed_url)
+    request_headers = dict(headers)
+    if cached:
+        etag, last_modified = cached[0], cached[1]
+        if etag:
+            request_headers["If-None-Match"] = etag
+        if last_modified:
+            request_headers["If-Modified-Since"] = last_modified
+
+    resp = session.get(feed_url, headers=request_headers, timeout=30)
+    if resp.status_code == 304 and cached:
+        return cached[2], cached[3], cached[4]
+    if resp.status_code != 200:
+        return None
+
+    content = resp.content or b""
+    ctype = (resp.headers.get("content-type") or "").lower()
+    # Mesmo critério de resp.text (charset do header ou detecção).
+    encoding = resp.encoding or resp.apparent_encoding or "utf-8"
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        # charset inválido no header (ex.: "utf8mb4"): str(..., encoding) levantaria LookupError.
+        encoding = "utf-8"
+    etag = resp.headers.get("ETag") or ""
+    last_modified = resp.headers.get("Last-Modified") or ""
+    if etag or last_modified:
+        with _feed_cache_lock:
+            _feed_cache[feed_url] = (etag, last_modified, content, ctype, encoding)
+    return content, ctype, encoding
+
+
+def _fetch_feed_items(
+    session: requests.Session,
+    source_name: str,
+    feed_url: str,
+    skip_links: frozenset[str] = frozenset(),
+) -> list[NewsItem]:
+    """Baixa e interpreta um feed (RSS ou WP JSON), devolvendo os itens com imagem.
+
+    Links em `skip_links` (já postados) são descartados antes de qualquer requisição ao artigo.
     """
-    feeds = FEED_PROFILES[profile]
     headers = {"User-Agent": "Mozilla/5.0 (compatible; GossipPostBot/1.0)"}
-    all_items = []
+    all_items: list[NewsItem] = []
 
-    for source_name, feed_url in feeds:
-        try:
-            resp = requests.get(feed_url, headers=headers, timeout=30)
-            if resp.status_code != 200:
-                continue
-
-            body = resp.text or ""
-            ctype = (resp.headers.get("content-type") or "").lower()
-
-            if "json" in ctype or body.lstrip().startswith("["):
-                posts = resp.json()
-                if isinstance(posts, list):
-                    for post in posts[:10]:
-                        title = _strip_html((post.get("title") or {}).get("rendered") or "")
-                        link = post.get("link") or ""
-
-                        image_url = ""
-                        embedded = post.get("_embedded") or {}
-                        media = embedded.get("wp:featuredmedia") or []
-                        if media and isinstance(media[0], dict):
-                            image_url = _clean_text(media[0].get("source_url") or "")
-
-                        if not image_url and link:
-                            try:
-                                article_resp = requests.get(link, headers=headers, timeout=20)
-                                if article_resp.status_code == 200:
-                                    import re
-
-                                    # Padrões simplificados para extração rápida no scheduler
-                                    patterns = [
-                                        r"<meta[^>]+property=[\"']og:image[\"'][^>]+content=[\"']([^\"']+)",
-                                        r"<img[^>]+src=[\"']([^\"']+)"
-                                    ]
-                                    for pattern in patterns:
-                                        match = re.search(pattern, article_resp.text, re.IGNORECASE)
-                                        if match:
-                                            url = match.group(1).strip()
-                                            if url.startswith("http"):
-                                                image_url = url
-                                                break
-                            except Exception:
-                                pass
-
-                        if title and link and image_url.startswith("http"):
-                            # Evita excerpt truncado: tenta puxar texto do artigo para servir de contexto.
-                            article_text = ""
-                            try:
-                                article_text = _extract_article_text(link)
-                            except Exception:
-                                article_text = ""
-
-                            description = article_text or _strip_html((post.get("excerpt") or {}).get("rendered") or "")
-
-                            all_items.append(
-                                NewsItem(
-                                    source=source_name,
-                                    feed_url=feed_url,
-                                    title=title,
-                                    link=link,
-                                    published=post.get("date") or "",
-                                    image_url=image_url,
-                                    description=description,
-                                )
-                            )
-            else:
-                root = ET.fromstring(body)
-                for item in root.findall("./channel/item")[:10]:
-                    title = _clean_text(item.findtext("title"))
-                    link = _clean_text(item.findtext("link"))
-
-                    image_url = _image_from_item(item)
+    try:
+        fetched = _fetch_feed_body(session, feed_url, headers)
+        if fetched is None:
+            return []
+        content, ctype, encoding = fetched
+        article_html: str | None
+
+        # WP JSON: parse os bytes direto (resp.text + resp.json() decodificava o corpo duas vezes).
+        if "json" in ctype or json_utils.looks_like_json_array(content):
+            posts = json_utils.loads_body(content, encoding)
+            if isinstance(posts, list):
+                for post in posts[:10]:
+                    title = _strip_html((post.get("title") or {}).get("rendered") or "")
+                    link = post.get("link") or ""
+                    if link in skip_links:
+                        continue
+
+                    image_url = ""
+                    embedded = post.get("_embedded") or {}
+                    media = embedded.get("wp:featuredmedia") or []
+                    if media and isinstance(media[0], dict):
+                        image_url = _clean_text(media[0].get("source_url") or "")
+
+                    # Uma única requisição ao artigo serve tanto de fallback de imagem quanto de texto.
+                    article_html = None
                     if not image_url and link:
-                        try:
-                            article_resp = requests.get(link, headers=headers, timeout=20)
-                            if article_resp.status_code == 200:
-                                import re
-
-                                patterns = [
-                                    r"<meta[^>]+property=[\"']og:image[\"'][^>]+content=[\"']([^\"']+)",
-                                    r"<img[^>]+src=[\"']([^\"']+)"
-                                ]
-                                for pattern in patterns:
-                                    match = re.search(pattern, article_resp.text, re.IGNORECASE)
-                                    if match:
-                                        url = match.group(1).strip()
-                                        if url.startswith("http"):
-                                            image_url = url
-                                            break
-                        except Exception:
-                            pass
-
-                    if title and link and image_url and image_url.startswith("http"):
-                        # Evita description truncado do RSS: tenta puxar artigo.
-                        article_text = ""
-                        try:
-                            article_text = _extract_article_text(link)
-                        except Exception:
-                            article_text = ""
-
-                        description = article_text or _strip_html(item.findtext("description") or "")
+                        if _recent_image_miss(link):
+                            continue
+                        article_html = _fetch_article_html(session, link, headers)
+                        image_url = _article_image_from_html(article_html)
+                        if article_html and not image_url:
+                            _remember_image_miss(link)
+
+                    if title and link and image_url.startswith("http"):
+                        # Evita excerpt truncado: tenta puxar texto do artigo para servir de contexto.
+                        if article_html is None:
+                            article_html = _fetch_article_html(session, link, headers)
+                        article_text = _article_text_from_html(article_html) if article_html else ""
+
+                        description = article_text or _strip_html((post.get("excerpt") or {}).get("rendered") or "")
 
                         all_items.append(
                             NewsItem(
@@ -232,13 +272,73 @@ def fetch_all_upcoming_news(profile="br"):
                                 feed_url=feed_url,
                                 title=title,
                                 link=link,
-                                published=_clean_text(item.findtext("pubDate")),
+                                published=post.get("date") or "",
                                 image_url=image_url,
                                 description=description,
                             )
                         )
-        except Exception:
-            continue
+        else:
+            root = ET.fromstring(str(content, encoding, errors="replace"))
+            for item in root.findall("./channel/item")[:10]:
+                title = _clean_text(item.findtext("title"))
+                link = _clean_text(item.findtext("link"))
+                if link in skip_links:
+                    continue
+
+                image_url = _image_from_item(item)
+                article_html = None
+                if not image_url and link:
+                    if _recent_image_miss(link):
+                        continue
+                    article_html = _fetch_article_html(session, link, headers)
+                    image_url = _article_image_from_html(article_html)
+                    if article_html and not image_url:
+                        _remember_image_miss(link)
+
+                if title and link and image_url and image_url.startswith("http"):
+                    # Evita description truncado do RSS: tenta puxar artigo.
+                    if article_html is None:
+                        article_html = _fetch_article_html(session, link, headers)
+                    article_text = _article_text_from_html(article_html) if article_html else ""
+
+                    description = article_text or _strip_html(item.findtext("description") or "")
+
+                    all_items.append(
+                        NewsItem(
+                            source=source_name,
+                            feed_url=feed_url,
+                            title=title,
+                            link=link,
+                            published=_clean_text(item.findtext("pubDate")),
+                            image_url=image_url,
+                            description=description,
+                        )
+                    )
+    except Exception:
+        return []
+    return all_items
+
+
+def fetch_all_upcoming_news(profile="br", skip_links=None):
+    """Busca todas as notícias disponíveis nos feeds do perfil.
+
+    Importante: para evitar 'corpo' truncado/incompleto no pipeline do scheduler,
+    prioriza a extração do texto do artigo (quando possível) em vez do excerpt do feed.
+    Os feeds são buscados em paralelo (uma sessão HTTP compartilhada, keep-alive);
+    a ordem dos itens segue a ordem dos feeds no perfil. Links em `skip_links`
+    (ex.: histórico) nem chegam a ter o artigo baixado.
+    """
+    feeds = FEED_PROFILES[profile]
+    if not feeds:
+        return []
+
+    skip = frozenset(skip_links or ())
+    all_items = []
+    # Sessão do módulo: o pool de conexões sobrevive entre as execuções do agendador.
+    session = _get_http_session()
+    with ThreadPoolExecutor(max_workers=min(FEED_FETCH_WORKERS, len(feeds))) as pool:
+        for items in pool.map(lambda feed: _fetch_feed_items(session, *feed, skip), feeds):
+            all_items.extend(items)
     return all_items
 
 def run_scheduler():
@@ -265,18 +365,15 @@ def run_scheduler():
 
                 print(f"\n[{now.strftime('%H:%M:%S')}] 🔔 Horário atingido! Verificando feeds...")
 
-                # Busca todas as notícias dos feeds BR
-                all_items = fetch_all_upcoming_news("br")
-
-                # Filtra o que já foi postado
-                new_items = [it for it in all_items if it.link not in history]
-                new_items.sort(key=_score_item, reverse=True)
+                # Busca todas as notícias dos feeds BR. O que já foi postado é descartado
+                # dentro da própria busca (um probe no set por item, antes de baixar o artigo).
+                new_items = fetch_all_upcoming_news("br", skip_links=frozenset(history))
 
                 if not new_items:
                     print("😴 Nenhuma notícia nova encontrada.")
                 else:
-                    # Pega as 3 primeiras novidades
-                    to_process = new_items[:3]
+                    # Pega as 3 melhores novidades (top-k por score, sem ordenar a lista toda)
+                    to_process = heapq.nlargest(3, new_items, key=_score_item)
                     print(f"✨ Encontradas {len(new_items)} novidades. Processando as {len(to_process)} primeiras...")
 
                     for i, item in enumerate(to_process, 1):
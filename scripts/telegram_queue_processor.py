@@ -12,24 +12,38 @@ import re
 import subprocess
 import sys
 import unicodedata
-import hashlib
+import threading
+import time
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict
 
-import requests
-
-
 ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from core.ai_client import OpenAIConfig, is_openai_configured
-from scripts.create_gossip_post import NewsItem, build_editorial_pack_for_item
+from core import json_utils
+from core.ai_client import (
+    FAST_FAIL_MAX_ATTEMPTS,
+    FAST_FAIL_MAX_RETRY_WAIT_S,
+    OpenAIConfig,
+    chat_completion,
+    is_openai_configured,
+)
+from core.file_utils import write_text_atomic
+from core.text_utils import stable_seed
 
 QUEUE_DIR = ROOT_DIR / "telegram_queue"
 QUEUE_DIR.mkdir(exist_ok=True)
 
+# Metadados (título/descrição) do yt-dlp por URL: reenvio do mesmo vídeo não refaz a consulta ao X.
+VIDEO_METADATA_CACHE_PATH = ROOT_DIR / "tools" / "video_metadata_cache.json"
+VIDEO_METADATA_TTL_S = 24 * 3600
+VIDEO_METADATA_CACHE_MAX = 200
+_video_metadata_lock = threading.Lock()
+_video_metadata_cache: dict[str, Any] | None = None
+
 # Configurações do Telegram
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "").strip()
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "").strip()
@@ -41,6 +55,8 @@ def send_message(chat_id: str, text: str) -> bool:
         print("TELEGRAM_BOT_TOKEN não configurado; aviso não enviado.")
         return False
 
+    import requests
+
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     try:
         data = {"chat_id": chat_id, "text": text, "parse_mode": "Markdown"}
@@ -51,8 +67,47 @@ def send_message(chat_id: str, text: str) -> bool:
         return False
 
 
+def _load_video_metadata_cache() -> dict[str, Any]:
+    """Cache em memória, lido do disco uma vez por processo (chamar com _video_metadata_lock)."""
+    global _video_metadata_cache
+    if _video_metadata_cache is None:
+        try:
+            data = json_utils.loads(VIDEO_METADATA_CACHE_PATH.read_bytes())
+        except (OSError, ValueError):
+            data = {}
+        _video_metadata_cache = data if isinstance(data, dict) else {}
+    return _video_metadata_cache
+
+
+def _cached_video_metadata(video_url: str) -> tuple[str, str] | None:
+    with _video_metadata_lock:
+        entry = _load_video_metadata_cache().get(video_url)
+    if not isinstance(entry, dict) or time.time() - float(entry.get("ts") or 0) > VIDEO_METADATA_TTL_S:
+        return None
+    return str(entry.get("title") or ""), str(entry.get("description") or "")
+
+
+def _store_video_metadata(video_url: str, title: str, description: str) -> None:
+    global _video_metadata_cache
+    with _video_metadata_lock:
+        cache = _load_video_metadata_cache()
+        cache[video_url] = {"title": title, "description": description, "ts": time.time()}
+        if len(cache) > VIDEO_METADATA_CACHE_MAX:
+            newest = sorted(cache.items(), key=lambda kv: float((kv[1] or {}).get("ts") or 0))[-VIDEO_METADATA_CACHE_MAX:]
+            cache = _video_metadata_cache = dict(newest)
+        try:
+            VIDEO_METADATA_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            write_text_atomic(VIDEO_METADATA_CACHE_PATH, json_utils.dumps(cache))
+        except OSError as e:
+            print(f"⚠️ Não foi possível salvar cache de metadados: {e}")
+
+
 def _extract_video_metadata(video_url: str) -> tuple[str, str]:
-    """Extrai título e descrição via yt-dlp sem baixar o arquivo."""
+    """Extrai título e descrição via yt-dlp sem baixar o arquivo (com cache local por URL)."""
+    cached = _cached_video_metadata(video_url)
+    if cached is not None:
+        return cached
+
     def _run_metadata(extractor_api: str | None = None) -> subprocess.CompletedProcess:
         cmd = [
             "yt-dlp",
@@ -84,18 +139,22 @@ def _extract_video_metadata(video_url: str) -> tuple[str, str]:
             if lines:
                 title = lines[0].strip()
                 description = "\n".join(lines[1:]).strip()
+                _store_video_metadata(video_url, title, description)
                 return title, description
     except Exception as e:
         print(f"⚠️ Não foi possível extrair metadados do vídeo: {e}")
     return "Flagra no X", ""
 
 
+_VIDEO_DASH_TABLE = str.maketrans({"—": "-", "–": "-"})
+
+
 def _normalize_video_text(raw: str) -> str:
     clean = (raw or "").split("|")[0]
     clean = re.sub(r"\(@[^)]+\)", "", clean)
     clean = re.sub(r"\bon\s+x\b", "", clean, flags=re.IGNORECASE)
     clean = re.sub(r"https?://\S+", "", clean)
-    clean = clean.replace("—", "-").replace("–", "-")
+    clean = clean.translate(_VIDEO_DASH_TABLE)
 
     if " - " in clean:
         _, right = clean.split(" - ", 1)
@@ -113,18 +172,26 @@ def _normalize_video_text(raw: str) -> str:
     return re.sub(r"\s+", " ", clean).strip(" -|")
 
 
+# Ordered (theme, keywords) rules: first theme with any keyword substring wins.
+VIDEO_THEME_KEYWORDS = (
+    ("bbb", ("bbb", "paredao", "elimin", "lider", "prova")),
+    ("treta", ("treta", "briga", "discuss", "barraco", "clim", "grit")),
+    ("romance", ("beijo", "beij", "casal", "romance", "ship", "ficou")),
+    ("separacao", ("trai", "chifre", "termin", "separ", "ex ", "ex-")),
+    ("flagra", ("flagra", "vazou", "video", "imagens", "registro")),
+)
+_VIDEO_THEME_PATTERNS = tuple(
+    (theme, re.compile("|".join(re.escape(k) for k in keywords)))
+    for theme, keywords in VIDEO_THEME_KEYWORDS
+)
+
+
+@lru_cache(maxsize=512)
 def _detect_video_theme(text: str) -> str:
     lowered = (text or "").lower()
-    if any(k in lowered for k in ("bbb", "paredao", "elimin", "lider", "prova")):
-        return "bbb"
-    if any(k in lowered for k in ("treta", "briga", "discuss", "barraco", "clim", "grit")):
-        return "treta"
-    if any(k in lowered for k in ("beijo", "beij", "casal", "romance", "ship", "ficou")):
-        return "romance"
-    if any(k in lowered for k in ("trai", "chifre", "termin", "separ", "ex ", "ex-")):
-        return "separacao"
-    if any(k in lowered for k in ("flagra", "vazou", "video", "imagens", "registro")):
-        return "flagra"
+    for theme, pattern in _VIDEO_THEME_PATTERNS:
+        if pattern.search(lowered):
+            return theme
     return "generic"
 
 
@@ -183,8 +250,7 @@ def _pick_editorial_body(theme: str, seed_text: str) -> str:
         "generic": ["Revelacao chocante", "Detalhe polemico", "Web dividida"],
     }
     options = body_by_theme.get(theme, body_by_theme["generic"])
-    digest = hashlib.md5((seed_text or "body").encode("utf-8")).hexdigest()
-    idx = int(digest, 16) % len(options)
+    idx = stable_seed(seed_text or "body") % len(options)
     return options[idx]
 
 
@@ -226,15 +292,17 @@ def _normalize_editorial_cta(text: str, theme: str) -> str:
     return fallback.get(theme, fallback["generic"])
 
 
+_COPY_LABEL_PREFIX_RE = re.compile(
+    r"^(gancho|hook|headline|titulo|title|body|corpo|tarja|descricao|descrição|description|cta|linha|line)\s*\d*\s*[:\-–—=]\s*",
+    flags=re.IGNORECASE,
+)
+
+
 def _build_video_copy_with_ai(title: str, description: str) -> tuple[str, str, str, str, str] | None:
     cfg = OpenAIConfig()
     if not is_openai_configured(cfg):
         return None
 
-    api_key = os.getenv(cfg.api_key_env, "").strip()
-    if not api_key:
-        return None
-
     context = _clean_telegram_text(f"{title}. {description}", 1600)
     if not context:
         return None
@@ -265,15 +333,7 @@ def _build_video_copy_with_ai(title: str, description: str) -> tuple[str, str, s
     }
 
     try:
-        r = requests.post(
-            f"{cfg.base_url.rstrip('/')}/chat/completions",
-            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-            json=payload,
-            timeout=60,
-        )
-        if r.status_code >= 400:
-            return None
-        data = r.json()
+        data = chat_completion(payload, cfg, max_attempts=FAST_FAIL_MAX_ATTEMPTS, max_retry_wait_s=FAST_FAIL_MAX_RETRY_WAIT_S)
         content = (((data.get("choices") or [{}])[0]).get("message") or {}).get("content")
         if not content:
             return None
@@ -284,12 +344,7 @@ def _build_video_copy_with_ai(title: str, description: str) -> tuple[str, str, s
                 continue
             if line.startswith("#"):
                 continue
-            line = re.sub(
-                r"^(gancho|hook|headline|titulo|title|body|corpo|tarja|descricao|descrição|description|cta|linha|line)\s*\d*\s*[:\-–—=]\s*",
-                "",
-                line,
-                flags=re.IGNORECASE,
-            ).strip()
+            line = _COPY_LABEL_PREFIX_RE.sub("", line).strip()
             if line:
                 lines.append(line)
 
@@ -342,8 +397,7 @@ def _build_video_copy_fallback(title: str, description: str) -> tuple[str, str,
         ],
     }
 
-    digest = hashlib.md5(_clean_telegram_text(base, 240).encode("utf-8")).hexdigest()
-    seed = int(digest, 16)
+    seed = stable_seed(_clean_telegram_text(base, 240))
     hook_pool = hooks.get(theme, hooks["generic"])
     hook = hook_pool[seed % len(hook_pool)]
 
@@ -395,6 +449,9 @@ def _build_video_copy_legacy(raw_title: str, raw_description: str = "") -> tuple
 
 def _build_video_copy(raw_title: str, raw_description: str = "", video_url: str = "") -> tuple[str, str, str, str, str, str]:
     """Build copy for Telegram video posts using the same V5 engine as scheduler."""
+    # Import tardio: com a fila vazia (caso comum no cron) o processador nem carrega o pipeline de posts.
+    from scripts.create_gossip_post import NewsItem, build_editorial_pack_for_item
+
     clean_title = _normalize_video_text(raw_title) or "Flagra no X"
     clean_desc = _normalize_video_text(raw_description)
 
@@ -565,11 +622,57 @@ def process_video_request(request: Dict[str, Any]) -> bool:
         return False
 
 
+def _list_request_files() -> list[Path]:
+    # Uma única leitura do diretório; DirEntry já traz o tipo, sem stat por arquivo.
+    with os.scandir(QUEUE_DIR) as it:
+        files = [
+            Path(entry.path)
+            for entry in it
+            if entry.name.startswith("request_") and entry.name.endswith(".json") and entry.is_file()
+        ]
+    files.sort()
+    return files
+
+
+def _process_request_file(request_file: Path) -> bool:
+    """Processa uma requisição da fila; True quando o post foi criado."""
+    try:
+        with open(request_file, "r", encoding="utf-8") as f:
+            request = json.load(f)
+
+        if request.get("status") != "pending":
+            print(f"⏭️  Pulando {request_file.name} (status: {request.get('status')})")
+            return False
+
+        request["status"] = "processing"
+        request["processing_started"] = datetime.now().isoformat()
+        with open(request_file, "w", encoding="utf-8") as f:
+            json.dump(request, f, indent=2, ensure_ascii=False)
+
+        success = False
+        if request["type"] == "foto":
+            success = process_foto_request(request)
+        elif request["type"] == "video":
+            success = process_video_request(request)
+        else:
+            print(f"⚠️ Tipo de requisição desconhecido: {request.get('type')}")
+
+        request["status"] = "completed" if success else "failed"
+        request["processing_finished"] = datetime.now().isoformat()
+        with open(request_file, "w", encoding="utf-8") as f:
+            json.dump(request, f, indent=2, ensure_ascii=False)
+
+        return success
+    except Exception as e:
+        print(f"⚠️ Erro ao processar {request_file.name}: {e}")
+        return False
+
+
 def process_queue() -> int:
     """Processa todas as requisições pendentes na fila."""
     print("🔍 Verificando fila de requisições...")
 
-    pending_files = sorted(QUEUE_DIR.glob("request_*.json"))
+    pending_files = _list_request_files()
 
     if not pending_files:
         print("✅ Nenhuma requisição pendente.")
@@ -577,39 +680,8 @@ def process_queue() -> int:
 
     print(f"📦 Encontradas {len(pending_files)} requisições")
 
-    processed = 0
-    for request_file in pending_files:
-        try:
-            with open(request_file, "r", encoding="utf-8") as f:
-                request = json.load(f)
-
-            if request.get("status") != "pending":
-                print(f"⏭️  Pulando {request_file.name} (status: {request.get('status')})")
-                continue
-
-            request["status"] = "processing"
-            request["processing_started"] = datetime.now().isoformat()
-            with open(request_file, "w", encoding="utf-8") as f:
-                json.dump(request, f, indent=2, ensure_ascii=False)
-
-            success = False
-            if request["type"] == "foto":
-                success = process_foto_request(request)
-            elif request["type"] == "video":
-                success = process_video_request(request)
-            else:
-                print(f"⚠️ Tipo de requisição desconhecido: {request.get('type')}")
-
-            request["status"] = "completed" if success else "failed"
-            request["processing_finished"] = datetime.now().isoformat()
-            with open(request_file, "w", encoding="utf-8") as f:
-                json.dump(request, f, indent=2, ensure_ascii=False)
-
-            if success:
-                processed += 1
-        except Exception as e:
-            print(f"⚠️ Erro ao processar {request_file.name}: {e}")
-            continue
+    # Sequencial de propósito: cada create_gossip_post.py grava em gossip_post/ (imagem, hook_history.json).
+    processed = sum(_process_request_file(f) for f in pending_files)
 
     print(f"\n✅ Processadas {processed} requisições com sucesso")
     return processed
@@ -12,6 +12,7 @@ from scripts.create_gossip_post import (
     build_editorial_pack_for_item,
     _is_valid_ai_cta,
     _plan_overlay_layout,
+    _render_overlay_text_png,
     _run_editorial_review_gate,
 )
 
@@ -67,6 +68,29 @@ class EditorialReviewTests(unittest.TestCase):
         rendered_body = " ".join(" ".join(layout["tarja_lines"]).split())
         self.assertEqual(rendered_body, " ".join(body.upper().split()))
 
+    def test_overlay_text_png_draws_hook_and_body_boxes(self):
+        from PIL import Image
+
+        layout = _plan_overlay_layout(
+            "JONAS CRITICA RIVAL E BBB PEGA FOGO",
+            "Jonas acusa falta de convivencia e a casa se divide apos o conflito no reality.",
+        )
+        png_path = _render_overlay_text_png(layout)
+        try:
+            with Image.open(png_path) as img:
+                self.assertEqual(img.size, (1080, 1920))
+                alpha = img.convert("RGBA").getchannel("A")
+        finally:
+            png_path.unlink(missing_ok=True)
+
+        hook_top = layout["hook_start_y"]
+        hook_bottom = hook_top + layout["hook_line_step"] * len(layout["hook_lines"])
+        body_top = layout["tarja_start_y"]
+        body_bottom = body_top + layout["tarja_line_step"] * len(layout["tarja_lines"])
+        self.assertIsNotNone(alpha.crop((0, hook_top, 1080, hook_bottom)).getbbox())
+        self.assertIsNotNone(alpha.crop((0, body_top, 1080, body_bottom)).getbbox())
+        self.assertIsNone(alpha.crop((0, 0, 1080, max(0, hook_top - 10))).getbbox())
+
     def test_subtle_image_filters_have_motion_without_geometric_zoom(self):
         filters = _build_subtle_image_zoom_filters(11.0, fps=30)
         joined = ",".join(filters)
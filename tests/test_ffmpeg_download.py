@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from core.ffmpeg_utils import _download_file
+
+PAYLOAD = os.urandom(10_000)
+RANGE_BYTES = 1024
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    accept_ranges = True
+    requested_ranges: list[str] = []
+
+    def log_message(self, format, *args):  # noqa: A002 - assinatura do BaseHTTPRequestHandler
+        pass
+
+    def do_HEAD(self):
+        self.send_response(200)
+        if self.accept_ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+
+    def do_GET(self):
+        range_header = self.headers.get("Range")
+        if range_header and self.accept_ranges:
+            type(self).requested_ranges.append(range_header)
+            lo, hi = (int(x) for x in range_header.removeprefix("bytes=").split("-"))
+            body = PAYLOAD[lo : hi + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {lo}-{hi}/{len(PAYLOAD)}")
+        else:
+            body = PAYLOAD
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class DownloadFileTests(unittest.TestCase):
+    def setUp(self) -> None:
+        _RangeHandler.accept_ranges = True
+        _RangeHandler.requested_ranges = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/ffmpeg.zip"
+        self.tmp = TemporaryDirectory()
+        self.dest = Path(self.tmp.name) / "ffmpeg.zip"
+        patcher = patch("core.ffmpeg_utils.DOWNLOAD_RANGE_BYTES", RANGE_BYTES)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def _leftovers(self) -> list[str]:
+        return sorted(p.name for p in self.dest.parent.iterdir() if p != self.dest)
+
+    def test_ranged_download_reassembles_file(self):
+        _download_file(self.url, self.dest)
+
+        self.assertEqual(self.dest.read_bytes(), PAYLOAD)
+        self.assertEqual(len(_RangeHandler.requested_ranges), 10)
+        self.assertEqual(self._leftovers(), [])
+
+    def test_resume_fetches_only_missing_ranges(self):
+        part = self.dest.with_name(self.dest.name + ".part")
+        state_path = self.dest.with_name(self.dest.name + ".part.json")
+        done = [0, 1, 2, 5]
+        buf = bytearray(len(PAYLOAD))
+        for i in done:
+            lo = i * RANGE_BYTES
+            buf[lo : lo + RANGE_BYTES] = PAYLOAD[lo : lo + RANGE_BYTES]
+        part.write_bytes(bytes(buf))
+        state_path.write_text(json.dumps({"url": self.url, "size": len(PAYLOAD), "done": done}), encoding="utf-8")
+
+        _download_file(self.url, self.dest)
+
+        self.assertEqual(self.dest.read_bytes(), PAYLOAD)
+        fetched = sorted(int(r.removeprefix("bytes=").split("-")[0]) // RANGE_BYTES for r in _RangeHandler.requested_ranges)
+        self.assertEqual(fetched, [3, 4, 6, 7, 8, 9])
+        self.assertEqual(self._leftovers(), [])
+
+    def test_stale_state_restarts_from_scratch(self):
+        state_path = self.dest.with_name(self.dest.name + ".part.json")
+        self.dest.with_name(self.dest.name + ".part").write_bytes(b"\0" * len(PAYLOAD))
+        state_path.write_text(json.dumps({"url": "http://outro/arquivo.zip", "size": 1, "done": [0]}), encoding="utf-8")
+
+        _download_file(self.url, self.dest)
+
+        self.assertEqual(self.dest.read_bytes(), PAYLOAD)
+        self.assertEqual(len(_RangeHandler.requested_ranges), 10)
+
+    def test_falls_back_to_single_stream_without_range_support(self):
+        _RangeHandler.accept_ranges = False
+
+        _download_file(self.url, self.dest)
+
+        self.assertEqual(self.dest.read_bytes(), PAYLOAD)
+        self.assertEqual(_RangeHandler.requested_ranges, [])
+        self.assertEqual(self._leftovers(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
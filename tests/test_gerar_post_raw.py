@@ -0,0 +1,44 @@
+import unittest
+from pathlib import Path
+
+from scripts.gerar_post_raw import Segment, _shared_input_groups
+
+
+class SharedInputGroupsTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.video = Path("raw/video/clip.mp4")
+        self.image = Path("raw/images/foto.jpg")
+
+    def _video(self, start: float, duration: float = 3.0) -> Segment:
+        return Segment(kind="video", source=self.video, duration=duration, start=start)
+
+    def test_monotonic_close_slots_share_one_input(self):
+        segments = [
+            self._video(0.0),
+            Segment(kind="image", source=self.image, duration=2.5),
+            self._video(3.5),
+            self._video(7.0),
+        ]
+
+        self.assertEqual(_shared_input_groups(segments), [[0, 2, 3]])
+
+    def test_out_of_order_slots_use_separate_inputs(self):
+        segments = [
+            self._video(4.0),
+            Segment(kind="image", source=self.image, duration=2.5),
+            self._video(0.0),
+        ]
+
+        self.assertEqual(_shared_input_groups(segments), [])
+
+    def test_sparse_slots_use_separate_inputs(self):
+        segments = [self._video(0.0, 2.0), self._video(30.0, 2.0)]
+
+        self.assertEqual(_shared_input_groups(segments), [])
+
+    def test_single_slot_is_not_shared(self):
+        self.assertEqual(_shared_input_groups([self._video(0.0)]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
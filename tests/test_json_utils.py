@@ -0,0 +1,27 @@
+import codecs
+import unittest
+
+from core import json_utils
+
+
+class LoadsBodyTests(unittest.TestCase):
+    def test_plain_utf8(self):
+        self.assertEqual(json_utils.loads_body('[{"t": "ação"}]'.encode("utf-8"), "utf-8"), [{"t": "ação"}])
+
+    def test_utf8_bom(self):
+        body = codecs.BOM_UTF8 + b'[{"t": "x"}]'
+        for encoding in (None, "utf-8", "UTF8"):
+            with self.subTest(encoding=encoding):
+                self.assertEqual(json_utils.loads_body(body, encoding), [{"t": "x"}])
+        self.assertTrue(json_utils.looks_like_json_array(b"  " + body))
+
+    def test_response_charset(self):
+        body = '[{"t": "notícia"}]'.encode("latin-1")
+        self.assertEqual(json_utils.loads_body(body, "ISO-8859-1"), [{"t": "notícia"}])
+
+    def test_unknown_charset_falls_back_to_utf8(self):
+        self.assertEqual(json_utils.loads_body(b'{"a": 1}', "x-bogus"), {"a": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
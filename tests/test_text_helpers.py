@@ -0,0 +1,86 @@
+import random
+import re
+import textwrap
+import unittest
+
+from scripts.create_gossip_post import _INCOMPLETE_PT_LINE_RE, _wrapped_line_count
+
+
+class WrappedLineCountTests(unittest.TestCase):
+    def _expected(self, text: str, width: int) -> int:
+        return len(textwrap.wrap(text, width=width, break_long_words=False, break_on_hyphens=False))
+
+    def test_matches_textwrap_on_edge_cases(self):
+        cases = [
+            "",
+            "A",
+            "JONAS CRITICA RIVAL E BBB PEGA FOGO",
+            "exatamente vinte e sete ch",
+            "palavra-com-hifen-bem-comprida-que-nao-cabe e depois mais texto",
+            "SUPERCALIFRAGILISTICEXPIALIDOCIOUS curto",
+        ]
+        for text in cases:
+            for width in (1, 5, 24, 27, 40):
+                with self.subTest(text=text, width=width):
+                    self.assertEqual(_wrapped_line_count(text, width), self._expected(text, width))
+
+    def test_matches_textwrap_on_random_text(self):
+        rng = random.Random(1234)
+        alphabet = "abcdeÁÉÍÓÚçãõ-?!"
+        for _ in range(500):
+            words = ["".join(rng.choices(alphabet, k=rng.randint(1, 14))) for _ in range(rng.randint(1, 30))]
+            text = " ".join(words)
+            width = rng.randint(4, 45)
+            self.assertEqual(_wrapped_line_count(text, width), self._expected(text, width), (text, width))
+
+
+class IncompleteLineRegexTests(unittest.TestCase):
+    # As quatro buscas originais de _looks_incomplete_pt_line, na ordem.
+    LEGACY_PATTERNS = (
+        r"\b(e|ou|de|do|da|no|na|em|com|para|por|que)\s*$",
+        r"\b(e|ou)\s+\1\b",
+        r"\b(E ISSO|E AGORA|ISSO)\s*$",
+        r"\b\w+(ando|endo|indo)\s*$",
+    )
+
+    def _legacy(self, text: str) -> bool:
+        return any(re.search(p, text, flags=re.I) for p in self.LEGACY_PATTERNS)
+
+    def test_matches_legacy_searches(self):
+        cases = [
+            "Jonas critica rival e",
+            "Jonas critica rival E",
+            "ela disse que",
+            "fala de",
+            "Jonas e e rival",
+            "Jonas ou ou rival",
+            "Jonas e ou rival",
+            "Jonas eou rival",
+            "E ISSO",
+            "e agora",
+            "tudo isso",
+            "Jonas segue falando",
+            "Jonas segue fazendo  ",
+            "Jonas segue rindo",
+            "Ando",
+            "Jonas critica rival.",
+            "casa dividida no reality",
+            "Ele pediu para sair",
+            "Jonas e Bruna e Ou",
+            "",
+        ]
+        for text in cases:
+            with self.subTest(text=text):
+                self.assertEqual(bool(_INCOMPLETE_PT_LINE_RE.search(text)), self._legacy(text))
+
+    def test_matches_legacy_searches_on_random_text(self):
+        rng = random.Random(4321)
+        vocab = ["e", "E", "ou", "OU", "de", "que", "isso", "ISSO", "agora", "falando", "vendo", "saindo",
+                 "Jonas", "rival", "casa", "ando", "para", "com", "x", ",", "."]
+        for _ in range(2000):
+            text = " ".join(rng.choices(vocab, k=rng.randint(1, 8)))
+            self.assertEqual(bool(_INCOMPLETE_PT_LINE_RE.search(text)), self._legacy(text), text)
+
+
+if __name__ == "__main__":
+    unittest.main()